@@ -0,0 +1,68 @@
+import os
+import shutil
+import subprocess
+
+import numpy as np
+import soundfile as sf
+
+
+def parse_time(text):
+    text = (text or "").strip()
+    if not text:
+        return None
+    seconds = 0.0
+    for part in text.split(':'):
+        seconds = seconds * 60 + float(part)
+    if seconds < 0:
+        raise ValueError(f"Invalid time: {text}")
+    return seconds
+
+
+def range_label(start, end):
+    def fmt(t):
+        if t is None:
+            return "end"
+        m, sec = divmod(t, 60)
+        return f"{int(m)}m{sec:04.1f}s"
+    return f"{fmt(start)}-{fmt(end)}"
+
+
+def _decode_range_soundfile(path, start, end):
+    with sf.SoundFile(path) as f:
+        sr = f.samplerate
+        first = int(round(start * sr))
+        last = f.frames if end is None else min(f.frames, int(round(end * sr)))
+        if last <= first:
+            raise Exception(f"Empty range {range_label(start, end)}")
+        f.seek(first)
+        data = f.read(last - first, dtype='float32', always_2d=True)
+    return data.T, sr
+
+
+def _decode_range_ffmpeg(path, start, end, ffmpeg_path, sample_rate):
+    cmd = [ffmpeg_path, "-v", "error", "-ss", f"{start:.3f}"]
+    if end is not None:
+        cmd += ["-t", f"{end - start:.3f}"]
+    cmd += ["-i", path, "-f", "f32le", "-acodec", "pcm_f32le", "-ac", "2", "-ar", str(sample_rate), "pipe:1"]
+    result = subprocess.run(cmd, capture_output=True)
+    if result.returncode != 0:
+        raise Exception(f"ffmpeg failed: {result.stderr.decode(errors='replace')[-500:]}")
+    data = np.frombuffer(result.stdout, dtype=np.float32)
+    if data.size == 0:
+        raise Exception(f"Empty range {range_label(start, end)}")
+    return data.reshape(-1, 2).T.copy(), sample_rate
+
+
+def decode_range(path, start, end=None, ffmpeg_path=None, sample_rate=44100):
+    # soundfile seeks straight to the first frame; anything it can't open is seeked by ffmpeg (-ss before -i)
+    try:
+        y, sr = _decode_range_soundfile(path, start, end)
+    except sf.LibsndfileError:
+        if not ffmpeg_path or not os.path.exists(ffmpeg_path):
+            ffmpeg_path = shutil.which("ffmpeg")
+        if not ffmpeg_path:
+            raise Exception("FFmpeg is required to decode this file format")
+        y, sr = _decode_range_ffmpeg(path, start, end, ffmpeg_path, sample_rate)
+    if y.shape[0] == 1:
+        y = np.repeat(y, 2, axis=0)
+    return np.ascontiguousarray(y[:2]), sr
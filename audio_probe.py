@@ -0,0 +1,128 @@
+import os
+import json
+import shutil
+import subprocess
+import threading
+from collections import namedtuple
+
+import soundfile as sf
+
+AudioInfo = namedtuple("AudioInfo", ["duration", "sample_rate", "channels", "frames"])
+
+
+class ProbeCache:
+    def __init__(self, cache_file=None, ffprobe_path=None, max_entries=5000):
+        self.cache_file = cache_file
+        self.ffprobe_path = ffprobe_path
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.entries = {}
+        self._dirty = False
+        self.load()
+
+    def load(self):
+        if self.cache_file and os.path.exists(self.cache_file):
+            try:
+                with open(self.cache_file, 'r', encoding='utf-8') as f:
+                    self.entries = json.load(f)
+            except:
+                self.entries = {}
+
+    def save(self):
+        if not self.cache_file or not self._dirty:
+            return
+        with self.lock:
+            data = dict(self.entries)
+            self._dirty = False
+        try:
+            tmp_path = self.cache_file + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.cache_file)
+        except:
+            pass
+
+    def _key(self, path):
+        st = os.stat(path)
+        return f"{os.path.abspath(path)}|{st.st_mtime_ns}|{st.st_size}"
+
+    def probe(self, path):
+        key = self._key(path)
+        with self.lock:
+            cached = self.entries.get(key)
+        if cached is not None:
+            return AudioInfo(*cached)
+
+        info = self._probe_soundfile(path)
+        if info is None:
+            info = self._probe_ffprobe(path)
+        if info is None:
+            raise Exception(f"Could not read audio header: {path}")
+
+        with self.lock:
+            # Drop stale entries for the same path (file was modified)
+            prefix = os.path.abspath(path) + "|"
+            for k in [k for k in self.entries if k.startswith(prefix)]:
+                del self.entries[k]
+            if len(self.entries) >= self.max_entries:
+                for k in list(self.entries)[:len(self.entries) - self.max_entries + 1]:
+                    del self.entries[k]
+            self.entries[key] = list(info)
+            self._dirty = True
+        self.save()
+        return info
+
+    def _probe_soundfile(self, path):
+        try:
+            info = sf.info(path)
+        except Exception:
+            return None
+        if not info.samplerate or info.frames <= 0:
+            return None
+        return AudioInfo(info.frames / info.samplerate, info.samplerate, info.channels, info.frames)
+
+    def _find_ffprobe(self):
+        if self.ffprobe_path and os.path.exists(self.ffprobe_path):
+            return self.ffprobe_path
+        return shutil.which("ffprobe")
+
+    def _probe_ffprobe(self, path):
+        ffprobe = self._find_ffprobe()
+        if not ffprobe:
+            return None
+        cmd = [
+            ffprobe, "-v", "error",
+            "-select_streams", "a:0",
+            "-show_entries", "stream=sample_rate,channels,duration:format=duration",
+            "-of", "json",
+            path
+        ]
+        try:
+            result = subprocess.run(cmd, capture_output=True, check=True, text=True)
+            data = json.loads(result.stdout)
+        except Exception:
+            return None
+        streams = data.get("streams") or []
+        if not streams:
+            return None
+        stream = streams[0]
+        sample_rate = int(stream.get("sample_rate") or 0)
+        channels = int(stream.get("channels") or 0)
+        duration = stream.get("duration") or data.get("format", {}).get("duration")
+        if not sample_rate or duration is None:
+            return None
+        duration = float(duration)
+        return AudioInfo(duration, sample_rate, channels, int(round(duration * sample_rate)))
+
+
+_default_cache = ProbeCache()
+
+
+def configure(cache_file=None, ffprobe_path=None):
+    global _default_cache
+    _default_cache = ProbeCache(cache_file=cache_file, ffprobe_path=ffprobe_path)
+    return _default_cache
+
+
+def probe(path):
+    return _default_cache.probe(path)
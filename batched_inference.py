@@ -0,0 +1,87 @@
+import numpy as np
+import torch
+from demucs.apply import apply_model
+
+from memory_budget import model_segment
+from silence import silence_background
+
+
+def window_weights(length):
+    # Triangular weights, as demucs uses for its own overlapping segments
+    half = length // 2
+    w = np.concatenate([np.arange(1, half + 1), np.arange(length - half, 0, -1)]).astype(np.float32)
+    return w / w.max()
+
+
+class BatchScheduler:
+    def __init__(self, model, device, batch_size=8, overlap=0.25, segment=None, silence_fill="zeros"):
+        self.model = model
+        self.device = device
+        self.batch_size = batch_size
+        limit = model_segment(model)
+        seconds = min(segment, limit) if segment and limit else (segment or limit or 10.0)
+        self.length = int(seconds * model.samplerate)
+        self.stride = max(1, int((1 - overlap) * self.length))
+        self.silence_fill = silence_fill
+        self.tracks = {}
+        self.regions = {}
+
+    def add(self, key, waveform, regions=None):
+        self.tracks[key] = np.ascontiguousarray(waveform, dtype=np.float32)
+        if regions is not None:
+            self.regions[key] = regions
+
+    def active(self, key, offset, valid):
+        regions = self.regions.get(key)
+        return regions is None or any(s < offset + valid and e > offset for s, e in regions)
+
+    def windows(self):
+        for key, y in self.tracks.items():
+            n = y.shape[-1]
+            offset = 0
+            while True:
+                # Windows that lie entirely in silence are left out of the batches
+                if self.active(key, offset, min(self.length, n - offset)):
+                    yield key, offset, min(self.length, n - offset)
+                if offset + self.length >= n:
+                    break
+                offset += self.stride
+
+    def run(self, progress=None):
+        n_sources = len(self.model.sources)
+        outputs = {k: np.zeros((n_sources,) + y.shape, dtype=np.float32) for k, y in self.tracks.items()}
+        weights = {k: np.zeros(y.shape[-1], dtype=np.float32) for k, y in self.tracks.items()}
+        w = window_weights(self.length)
+
+        windows = list(self.windows())
+        if not windows:
+            return {k: silence_background(y, n_sources, self.silence_fill) for k, y in self.tracks.items()}
+        batch = np.zeros((self.batch_size, 2, self.length), dtype=np.float32)
+        for first in range(0, len(windows), self.batch_size):
+            group = windows[first:first + self.batch_size]
+            batch[:] = 0.0
+            for i, (key, offset, valid) in enumerate(group):
+                batch[i, :, :valid] = self.tracks[key][:, offset:offset + valid]
+
+            mix = torch.from_numpy(batch[:len(group)]).to(self.device)
+            with torch.no_grad():
+                # No random shifts: they pad the window beyond the model's training length
+                estimates = apply_model(self.model, mix, device=self.device, split=False, shifts=0).cpu().numpy()
+
+            for i, (key, offset, valid) in enumerate(group):
+                # A window that covers a whole clip needs no fade; otherwise overlap-add with triangular weights
+                if offset == 0 and valid == self.tracks[key].shape[-1]:
+                    outputs[key][...] = estimates[i, :, :, :valid]
+                    weights[key][:] = 1.0
+                    continue
+                outputs[key][..., offset:offset + valid] += estimates[i, :, :, :valid] * w[:valid]
+                weights[key][offset:offset + valid] += w[:valid]
+            if progress:
+                progress(min(first + self.batch_size, len(windows)), len(windows))
+
+        for key in outputs:
+            outputs[key] /= np.maximum(weights[key], 1e-8)
+            silent = weights[key] == 0
+            if silent.any():
+                outputs[key][..., silent] = silence_background(self.tracks[key][:, silent], n_sources, self.silence_fill)
+        return outputs
@@ -0,0 +1,143 @@
+import sys
+import argparse
+
+from audio_io import parse_time
+from engine import StemEngine
+
+
+def print_info(text):
+    print(text, file=sys.stderr, flush=True)
+
+
+def print_progress(percent, speed="", eta=""):
+    if sys.stderr.isatty():
+        print(f"\rProgress: {percent:.1f}%", end="", file=sys.stderr, flush=True)
+
+
+def make_engine(args):
+    engine = StemEngine(
+        config_file=args.config,
+        output_dir=getattr(args, "output_dir", None),
+        on_info=None if args.quiet else print_info,
+        on_progress=None if args.quiet else print_progress
+    )
+    return engine
+
+
+def apply_job_options(engine, args):
+    engine.stem_mode = args.stems
+    engine.quality = args.quality
+    if args.no_post_process:
+        engine.post_process = False
+    try:
+        start = parse_time(args.start)
+        end = parse_time(args.end)
+        engine.deadline = parse_time(args.deadline)
+    except ValueError:
+        raise SystemExit("--start/--end/--deadline must be given as seconds or m:ss")
+    if start is not None or end is not None:
+        start = start or 0.0
+        if end is not None and end <= start:
+            raise SystemExit("--end must be after --start")
+        engine.time_range = (start, end)
+
+
+def separate(args):
+    engine = make_engine(args)
+    apply_job_options(engine, args)
+    engine.mode = "download_only" if args.download_only else "download_separate"
+    engine.max_jobs = args.jobs
+
+    urls, local_files = engine.parse_sources(args.sources)
+    total, skipped, failed = engine.run(urls, local_files)
+    print(engine.summarize(total, skipped, failed))
+    return 1 if failed else 0
+
+
+def coordinate(args):
+    from distributed import Coordinator
+    engine = make_engine(args)
+    apply_job_options(engine, args)
+    coordinator = Coordinator(engine, args.host, args.port, token=args.token, retries=args.retries, steal_after=args.steal_after)
+    urls, local_files = engine.parse_sources(args.sources)
+    total, skipped, failed = coordinator.run(urls, local_files)
+    print(engine.summarize(total, skipped, failed))
+    return 1 if failed else 0
+
+
+def work(args):
+    from distributed import Worker, DEFAULT_PORT
+    host, _, port = args.coordinator.rpartition(":")
+    if not host:
+        host, port = args.coordinator, DEFAULT_PORT
+    engine = make_engine(args)
+    worker = Worker(engine, host, int(port), token=args.token, name=args.name)
+    completed = worker.run()
+    print(f"Worker finished {completed} job(s)")
+    return 0
+
+
+def add_job_options(p):
+    p.add_argument("--stems", choices=["2", "4", "lite"], default="2",
+                   help="2 = vocals/instrumental, 4 = vocals/drums/bass/other, lite = quick rough 4-stem split without torch")
+    p.add_argument("--quality", choices=["128", "192", "320"], default="320", help="Download bitrate in kbps")
+    p.add_argument("--start", default=None, help="Only separate from this time (seconds or m:ss)")
+    p.add_argument("--end", default=None, help="Only separate up to this time (seconds or m:ss)")
+    p.add_argument("--no-post-process", action="store_true", help="Keep the raw model output")
+    p.add_argument("--deadline", default=None,
+                   help="Wall-clock budget per track (seconds or m:ss); quality is lowered as needed to meet it")
+
+
+def add_common_options(p):
+    p.add_argument("--config", default=None, help="Path to config.json")
+    p.add_argument("--quiet", action="store_true")
+
+
+def main(argv=None):
+    # Messages carry emoji; don't let a legacy console encoding abort the job
+    for stream in (sys.stdout, sys.stderr):
+        if hasattr(stream, "reconfigure"):
+            stream.reconfigure(errors="replace")
+
+    parser = argparse.ArgumentParser(description="Music Stem Separator without the GUI.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("separate", help="Download and/or separate URLs, audio files or folders")
+    p.add_argument("sources", nargs="+", help="URLs, audio files or folders (folders are scanned recursively)")
+    add_job_options(p)
+    p.add_argument("--output-dir", default=None, help="Defaults to the output folder saved in config.json")
+    p.add_argument("--jobs", type=int, default=None, help="Most files to separate at once (still limited by the RAM budget)")
+    p.add_argument("--download-only", action="store_true", help="Download URLs without separating them")
+    add_common_options(p)
+    p.set_defaults(func=separate)
+
+    p = sub.add_parser("coordinator", help="Hand a batch out to workers on other machines and collect their stems")
+    p.add_argument("sources", nargs="+", help="URLs, audio files or folders (folders are scanned recursively)")
+    add_job_options(p)
+    p.add_argument("--output-dir", default=None, help="Where finished stems are written")
+    p.add_argument("--host", default="0.0.0.0")
+    p.add_argument("--port", type=int, default=5055)
+    p.add_argument("--token", default=None, help="Shared secret workers must present")
+    p.add_argument("--retries", type=int, default=2, help="Times a failed track is re-queued")
+    p.add_argument("--steal-after", type=float, default=30.0,
+                   help="Seconds a track must have been running before an idle worker may duplicate it")
+    add_common_options(p)
+    p.set_defaults(func=coordinate)
+
+    p = sub.add_parser("worker", help="Separate tracks handed out by a coordinator")
+    p.add_argument("coordinator", help="host:port of the coordinator")
+    p.add_argument("--token", default=None)
+    p.add_argument("--name", default=None, help="Shown in the coordinator's log (default: host name)")
+    add_common_options(p)
+    p.set_defaults(func=work)
+
+    args = parser.parse_args(argv)
+    try:
+        return args.func(args)
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+import time
+from collections import namedtuple
+
+Setting = namedtuple("Setting", ["model", "overlap", "shifts", "precision"])
+
+# Best first; each rung is cheaper than the one above it. The first rung is what a normal run uses.
+# Segment length is deliberately not a rung: it is set by the memory budget and capped by each model's trained
+# segment, and a shorter segment only adds window overlap without making a track faster to separate.
+# The fp16 rungs only apply on CUDA; DeadlinePlanner drops them on CPU, where autocast to fp16 isn't faster.
+LADDERS = {
+    "2": [
+        Setting("mdx_extra", 0.25, 1, "fp32"),
+        Setting("mdx_extra", 0.1, 1, "fp32"),
+        Setting("mdx_extra", 0.1, 0, "fp32"),
+        Setting("htdemucs", 0.25, 1, "fp32"),
+        Setting("htdemucs", 0.1, 0, "fp32"),
+        Setting("htdemucs", 0.1, 0, "fp16"),
+        Setting("htdemucs", 0.0, 0, "fp16"),
+    ],
+    "4": [
+        Setting("htdemucs", 0.25, 1, "fp32"),
+        Setting("htdemucs", 0.1, 1, "fp32"),
+        Setting("htdemucs", 0.1, 0, "fp32"),
+        Setting("htdemucs", 0.1, 0, "fp16"),
+        Setting("htdemucs", 0.0, 0, "fp16"),
+    ],
+}
+
+# Seconds of compute per second of audio with no overlap, no shifts and fp32, until this host has measured its own
+DEFAULT_RATES = {
+    'cpu': {'mdx_extra': 1.0, 'htdemucs': 0.3},
+    'cuda': {'mdx_extra': 0.04, 'htdemucs': 0.02},
+}
+
+
+def default_setting(model_name):
+    return Setting(model_name, 0.25, 1, "fp32")
+
+
+def cost_factor(setting):
+    # Overlapping windows are run again; a random shift pads each window by half a second
+    factor = 1.0 / (1.0 - setting.overlap)
+    if setting.shifts:
+        factor *= setting.shifts * 1.05
+    if setting.precision != "fp32":
+        factor *= 0.6
+    return factor
+
+
+def describe(setting):
+    return f"{setting.model}, overlap {setting.overlap:g}, shifts {setting.shifts}, {setting.precision}"
+
+
+class Throughput:
+    def __init__(self, table=None, smoothing=0.5):
+        self.table = dict(table or {})
+        self.smoothing = smoothing
+
+    def rate(self, model_name, device_type):
+        key = f"{model_name}|{device_type}"
+        if key in self.table:
+            return self.table[key]
+        defaults = DEFAULT_RATES.get(device_type, DEFAULT_RATES['cpu'])
+        default = defaults.get(model_name, max(defaults.values()))
+        # Scale from another model measured on this host rather than trusting the generic figure
+        for other, other_default in defaults.items():
+            measured = self.table.get(f"{other}|{device_type}")
+            if measured is not None:
+                return measured * default / other_default
+        return default
+
+    def estimate(self, setting, audio_seconds, device_type):
+        return audio_seconds * self.rate(setting.model, device_type) * cost_factor(setting)
+
+    def record(self, setting, audio_seconds, elapsed, device_type):
+        if audio_seconds < 1.0 or elapsed <= 0:
+            return
+        key = f"{setting.model}|{device_type}"
+        observed = elapsed / audio_seconds / cost_factor(setting)
+        old = self.table.get(key)
+        self.table[key] = round(observed if old is None else old + (observed - old) * self.smoothing, 4)
+
+
+class DeadlinePlanner:
+    def __init__(self, seconds, stem_count, throughput, device_type, loaded=(), reserve=0.15, load_seconds=5.0):
+        self.seconds = seconds
+        self.deadline_at = time.time() + seconds
+        self.throughput = throughput
+        self.device_type = device_type
+        # Half precision is CUDA-only; on CPU the ladder ends at the cheapest fp32 rung
+        self.ladder = [
+            s for s in LADDERS.get(stem_count, LADDERS["4"])
+            if s.precision == "fp32" or device_type == 'cuda'
+        ]
+        self.loaded = loaded
+        self.reserve = reserve
+        self.load_seconds = load_seconds
+        self.floor = None
+        self.used = []
+
+    def remaining(self):
+        return self.deadline_at - time.time()
+
+    def estimate(self, setting, audio_seconds):
+        seconds = self.throughput.estimate(setting, audio_seconds, self.device_type)
+        if setting.model not in self.loaded:
+            seconds += self.load_seconds
+        return seconds
+
+    def choose(self, audio_seconds):
+        # Writing and post-processing the stems still has to fit after the model is done
+        budget = self.remaining() * (1.0 - self.reserve)
+        start = self.floor or 0
+        index = len(self.ladder) - 1
+        for i in range(start, len(self.ladder)):
+            if self.estimate(self.ladder[i], audio_seconds) <= budget:
+                index = i
+                break
+        # Later chunks may climb back up when ahead of schedule, but never above the first choice:
+        # the job's memory was admitted for that model
+        if self.floor is None:
+            self.floor = index
+        setting = self.ladder[index]
+        if setting.model not in self.used:
+            self.used.append(setting.model)
+        return setting
+
+    def models(self):
+        return "+".join(self.used)
+
+    def summary(self):
+        late = -self.remaining()
+        if late > 0:
+            return f"⏱ Deadline missed by {late:.0f}s"
+        return f"⏱ Finished {self.seconds - self.remaining():.0f}s into a {self.seconds:.0f}s deadline"
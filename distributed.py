@@ -0,0 +1,451 @@
+import os
+import json
+import time
+import shutil
+import socket
+import struct
+import tempfile
+import threading
+from collections import deque
+
+import soundfile as sf
+
+from library import content_fingerprint
+
+DEFAULT_PORT = 5055
+CHUNK = 1 << 20
+# Stem folders are sent with their raw stems so post-processing can be re-tuned on the coordinator
+SKIP_DIRS = (".processed", ".stft_cache")
+
+
+def send_msg(sock, header, files=()):
+    data = json.dumps(header).encode()
+    sock.sendall(struct.pack("!I", len(data)) + data)
+    for path in files:
+        with open(path, 'rb') as f:
+            while True:
+                block = f.read(CHUNK)
+                if not block:
+                    break
+                sock.sendall(block)
+
+
+def recv_exact(sock, n):
+    buf = bytearray()
+    while len(buf) < n:
+        block = sock.recv(min(CHUNK, n - len(buf)))
+        if not block:
+            raise ConnectionError("Connection closed")
+        buf += block
+    return bytes(buf)
+
+
+def recv_msg(sock):
+    (n,) = struct.unpack("!I", recv_exact(sock, 4))
+    return json.loads(recv_exact(sock, n))
+
+
+def recv_file(sock, size, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        remaining = size
+        while remaining:
+            block = sock.recv(min(CHUNK, remaining))
+            if not block:
+                raise ConnectionError("Connection closed mid-transfer")
+            f.write(block)
+            remaining -= len(block)
+
+
+def safe_join(root, rel):
+    path = os.path.normpath(os.path.join(root, rel))
+    if os.path.isabs(rel) or not path.startswith(os.path.normpath(root) + os.sep):
+        raise ValueError(f"Refusing path outside output folder: {rel}")
+    return path
+
+
+def stem_folder_files(folder):
+    files = []
+    for dirpath, dirs, names in os.walk(folder):
+        dirs[:] = [d for d in dirs if d not in SKIP_DIRS]
+        for name in names:
+            if not name.endswith(".tmp"):
+                files.append(os.path.join(dirpath, name))
+    return sorted(files)
+
+
+class Job:
+    def __init__(self, job_id, source, is_url):
+        self.id = job_id
+        self.source = source
+        self.is_url = is_url
+        self.attempts = 0
+        self.workers = set()
+        self.failed_on = set()
+        self.started = None
+        self.status = "queued"
+        self.error = None
+        self.stems = None
+
+
+class Scheduler:
+    def __init__(self, urls, files, retries=2, steal_after=30.0):
+        self.jobs = {}
+        for source, is_url in [(u, True) for u in urls] + [(f, False) for f in files]:
+            job = Job(len(self.jobs) + 1, source, is_url)
+            self.jobs[job.id] = job
+        self.queue = deque(self.jobs)
+        self.retries = retries
+        self.steal_after = steal_after
+        self.connected = set()
+        self.cond = threading.Condition()
+
+    def finished(self):
+        return all(j.status in ("done", "failed") for j in self.jobs.values())
+
+    def connect(self, worker):
+        with self.cond:
+            self.connected.add(worker)
+
+    def next_job(self, worker):
+        with self.cond:
+            for job_id in list(self.queue):
+                job = self.jobs[job_id]
+                if job.status != "queued":
+                    self.queue.remove(job_id)
+                    continue
+                # A retry goes to a different machine unless every connected worker has failed it
+                if worker in job.failed_on and not self.connected <= job.failed_on:
+                    continue
+                self.queue.remove(job_id)
+                return self._assign(job, worker)
+            # Work stealing: with nothing queued, an idle worker re-runs the longest-running shard
+            # of another worker; whichever copy finishes first is kept
+            now = time.time()
+            running = [
+                j for j in self.jobs.values()
+                if j.status == "running" and worker not in j.workers | j.failed_on and len(j.workers) < 2
+                and now - j.started >= self.steal_after
+            ]
+            if running:
+                return self._assign(min(running, key=lambda j: j.started), worker)
+            return None
+
+    def _assign(self, job, worker):
+        if job.status == "queued":
+            job.started = time.time()
+        job.status = "running"
+        job.workers.add(worker)
+        return job
+
+    def claim(self, job_id, worker):
+        with self.cond:
+            job = self.jobs[job_id]
+            job.workers.discard(worker)
+            # A queued job may still be finished by a copy that was running when its commit failed
+            if job.status not in ("running", "queued"):
+                return False
+            job.status = "committing"
+            return True
+
+    def commit_failed(self, job_id, error):
+        # Whoever else still holds the job can finish it, but it must not stay in "committing"
+        with self.cond:
+            job = self.jobs[job_id]
+            job.attempts += 1
+            job.error = str(error)
+            if job.attempts > self.retries:
+                job.status = "failed"
+            else:
+                job.status = "queued"
+                self.queue.append(job.id)
+            self.cond.notify_all()
+
+    def complete(self, job_id, stems):
+        with self.cond:
+            job = self.jobs[job_id]
+            job.status = "done"
+            job.stems = stems
+            self.cond.notify_all()
+
+    def fail(self, job_id, worker, error):
+        with self.cond:
+            job = self.jobs[job_id]
+            job.workers.discard(worker)
+            job.failed_on.add(worker)
+            if job.status not in ("running", "committing") or job.workers:
+                return
+            job.attempts += 1
+            job.error = str(error)
+            if job.attempts > self.retries:
+                job.status = "failed"
+            else:
+                job.status = "queued"
+                self.queue.append(job.id)
+            self.cond.notify_all()
+
+    def worker_lost(self, worker, error="Worker disconnected"):
+        with self.cond:
+            self.connected.discard(worker)
+            ids = [j.id for j in self.jobs.values() if worker in j.workers]
+        for job_id in ids:
+            self.fail(job_id, worker, error)
+
+    def wait(self, timeout=None):
+        with self.cond:
+            return self.cond.wait_for(self.finished, timeout)
+
+
+class Coordinator:
+    def __init__(self, engine, host="0.0.0.0", port=DEFAULT_PORT, token=None, retries=2, steal_after=30.0):
+        self.engine = engine
+        self.host = host
+        self.port = port
+        self.token = token
+        self.retries = retries
+        self.steal_after = steal_after
+        self.scheduler = None
+        self.server = None
+        self.connections = {}
+        self.connections_lock = threading.Lock()
+
+    def settings(self):
+        return {
+            "stem_mode": self.engine.stem_mode,
+            "quality": self.engine.quality,
+            "time_range": self.engine.time_range,
+            "post_process": self.engine.post_process,
+            "deadline": self.engine.deadline,
+        }
+
+    def run(self, urls, local_files):
+        engine = self.engine
+        if not urls and not local_files:
+            raise Exception("⚠️ Please enter valid URL(s) or local audio files")
+        stem_mode = engine.ingest_mode(engine.time_range)
+        pending = engine.ingest_state.pending(local_files, stem_mode)
+        skipped = len(local_files) - len(pending)
+        self.scheduler = Scheduler(urls, pending, self.retries, self.steal_after)
+        total = len(self.scheduler.jobs)
+        os.makedirs(engine.output_dir, exist_ok=True)
+
+        self.server = socket.create_server((self.host, self.port))
+        self.port = self.server.getsockname()[1]
+        engine.update_info(f"Coordinator listening on {self.host}:{self.port} with {total} track(s) to separate")
+        threading.Thread(target=self.accept_loop, daemon=True).start()
+        try:
+            while not self.scheduler.wait(timeout=5.0):
+                done = sum(1 for j in self.scheduler.jobs.values() if j.status in ("done", "failed"))
+                engine.update_progress(done / max(total, 1) * 100)
+        finally:
+            self.server.close()
+            self.dismiss_workers()
+
+        failed = []
+        for job in self.scheduler.jobs.values():
+            if job.status == "failed":
+                failed.append(f"{os.path.basename(job.source)}: {job.error}")
+                if not job.is_url:
+                    engine.ingest_state.mark_failed(job.source, stem_mode, job.error)
+        engine.update_info("🎉 All processing completed!" if not failed else f"⚠️ Completed with {len(failed)} failure(s)")
+        return total, skipped, failed
+
+    def dismiss_workers(self):
+        # Tell every worker the batch is over, including ones still running a duplicate or sleeping on "wait"
+        with self.connections_lock:
+            connections = list(self.connections.items())
+        for conn, lock in connections:
+            try:
+                with lock:
+                    send_msg(conn, {"type": "done"})
+                conn.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def reply(self, conn, header, files=()):
+        with self.connections_lock:
+            lock = self.connections[conn]
+        with lock:
+            send_msg(conn, header, files)
+
+    def accept_loop(self):
+        while True:
+            try:
+                conn, addr = self.server.accept()
+            except OSError:
+                return
+            threading.Thread(target=self.serve_worker, args=(conn, addr), daemon=True).start()
+
+    def serve_worker(self, conn, addr):
+        worker = f"{addr[0]}:{addr[1]}"
+        with self.connections_lock:
+            self.connections[conn] = threading.Lock()
+        try:
+            with conn:
+                hello = recv_msg(conn)
+                if hello.get("type") != "hello" or (self.token and hello.get("token") != self.token):
+                    self.reply(conn, {"type": "rejected"})
+                    return
+                worker = f"{hello.get('name') or addr[0]} ({addr[0]}:{addr[1]})"
+                self.scheduler.connect(worker)
+                self.engine.update_info(f"Worker connected: {worker}")
+                while True:
+                    msg = recv_msg(conn)
+                    if msg["type"] == "request":
+                        self.send_work(conn, worker)
+                    elif msg["type"] == "result":
+                        self.receive_result(conn, worker, msg)
+                    elif msg["type"] == "failed":
+                        self.engine.update_info(f"Job {msg['job_id']} failed on {worker}: {msg['error']}")
+                        self.scheduler.fail(msg["job_id"], worker, msg["error"])
+        except (ConnectionError, OSError, ValueError) as e:
+            if not self.scheduler.finished():
+                self.engine.update_info(f"Worker {worker} dropped: {e}")
+        finally:
+            with self.connections_lock:
+                self.connections.pop(conn, None)
+            self.scheduler.worker_lost(worker)
+
+    def send_work(self, conn, worker):
+        if self.scheduler.finished():
+            self.reply(conn, {"type": "done"})
+            return
+        job = self.scheduler.next_job(worker)
+        if job is None:
+            self.reply(conn, {"type": "wait", "seconds": 2.0})
+            return
+        header = {"type": "job", "job_id": job.id, "settings": self.settings()}
+        if job.is_url:
+            header["url"] = job.source
+            self.reply(conn, header)
+        else:
+            header["name"] = os.path.basename(job.source)
+            header["size"] = os.path.getsize(job.source)
+            self.reply(conn, header, [job.source])
+        self.engine.update_info(f"Job {job.id} ({os.path.basename(job.source)}) → {worker}")
+
+    def receive_result(self, conn, worker, msg):
+        engine = self.engine
+        incoming = tempfile.mkdtemp(prefix=".incoming_", dir=engine.output_dir)
+        try:
+            # Errors while receiving drop the connection; worker_lost then re-queues the job
+            for f in msg["files"]:
+                recv_file(conn, f["size"], safe_join(incoming, f["path"]))
+            if not self.scheduler.claim(msg["job_id"], worker):
+                return
+            try:
+                for f in msg["files"]:
+                    target = safe_join(engine.output_dir, f["path"])
+                    os.makedirs(os.path.dirname(target), exist_ok=True)
+                    os.replace(safe_join(incoming, f["path"]), target)
+                stems = {name: safe_join(engine.output_dir, rel) for name, rel in msg["stems"].items()}
+                self.commit(self.scheduler.jobs[msg["job_id"]], stems, msg)
+            except Exception as e:
+                # The worker is no longer an assignee after claim, so worker_lost would not find this job
+                engine.update_info(f"Job {msg['job_id']} from {worker} could not be saved: {e}")
+                self.scheduler.commit_failed(msg["job_id"], e)
+                return
+            self.scheduler.complete(msg["job_id"], stems)
+            engine.update_info(f"✅ Job {msg['job_id']} finished on {worker}")
+        finally:
+            shutil.rmtree(incoming, ignore_errors=True)
+
+    def commit(self, job, stems, msg):
+        engine = self.engine
+        stem_mode = engine.ingest_mode(engine.time_range)
+        folder = os.path.dirname(next(iter(stems.values())))
+        if not job.is_url:
+            engine.ingest_state.mark_processed(job.source, stem_mode, folder)
+        try:
+            engine.library.add(
+                os.path.basename(os.path.dirname(folder)),
+                stems,
+                source=job.source if job.is_url else os.path.abspath(job.source),
+                fingerprint=msg.get("fingerprint") or (None if job.is_url else content_fingerprint(job.source)),
+                model=msg.get("model"),
+                stem_mode=stem_mode,
+                duration=msg.get("duration"),
+                sample_rate=44100
+            )
+            if engine.on_library_changed:
+                engine.on_library_changed()
+        except Exception as e:
+            engine.update_info(f"Warning: Could not update library: {e}")
+
+
+class Worker:
+    def __init__(self, engine, host, port=DEFAULT_PORT, token=None, name=None):
+        self.engine = engine
+        self.host = host
+        self.port = port
+        self.token = token
+        self.name = name or socket.gethostname()
+
+    def run(self):
+        # Results live on the coordinator; this machine's library must not point at the temp folders
+        self.engine.record_library = False
+        self.completed = 0
+        with socket.create_connection((self.host, self.port)) as conn:
+            send_msg(conn, {"type": "hello", "name": self.name, "token": self.token})
+            try:
+                self.serve(conn)
+            except (ConnectionError, OSError) as e:
+                # The coordinator closes every connection once the batch is done, even mid-way through a duplicate
+                self.engine.update_info(f"Coordinator closed the connection ({e})")
+        return self.completed
+
+    def serve(self, conn):
+        while True:
+            send_msg(conn, {"type": "request"})
+            msg = recv_msg(conn)
+            if msg["type"] == "rejected":
+                raise Exception("Coordinator rejected this worker (check --token)")
+            if msg["type"] == "done":
+                return
+            if msg["type"] == "wait":
+                time.sleep(msg.get("seconds", 2.0))
+                continue
+            work_dir = tempfile.mkdtemp(prefix="stem_worker_")
+            try:
+                source = msg.get("url")
+                if source is None:
+                    source = os.path.join(work_dir, "input", os.path.basename(msg["name"]))
+                    recv_file(conn, msg["size"], source)
+                try:
+                    header, files = self.separate(msg, source, work_dir)
+                except Exception as e:
+                    send_msg(conn, {"type": "failed", "job_id": msg["job_id"], "error": str(e)})
+                    continue
+                send_msg(conn, header, files)
+                self.completed += 1
+            finally:
+                shutil.rmtree(work_dir, ignore_errors=True)
+
+    def separate(self, msg, source, work_dir):
+        engine = self.engine
+        settings = msg["settings"]
+        engine.set_output_dir(os.path.join(work_dir, "output"))
+        engine.stem_mode = settings["stem_mode"]
+        engine.quality = settings.get("quality", engine.quality)
+        engine.post_process = settings.get("post_process", True)
+        engine.deadline = settings.get("deadline")
+        time_range = tuple(settings["time_range"]) if settings.get("time_range") else None
+        engine.time_range = time_range
+
+        engine.update_info(f"Job {msg['job_id']}: {msg.get('url') or msg['name']}")
+        audio_file = engine.download_audio(source, engine.quality) if msg.get("url") else source
+        stems = engine.separate_stems(audio_file, time_range=time_range, source=msg.get("url"))
+
+        output_dir = engine.output_dir
+        folder = os.path.dirname(next(iter(stems.values())))
+        files = stem_folder_files(folder)
+        header = {
+            "type": "result",
+            "job_id": msg["job_id"],
+            "model": engine.model_name_for(engine.stem_mode),
+            "duration": max(sf.info(p).duration for p in stems.values()),
+            "fingerprint": content_fingerprint(audio_file),
+            "stems": {name: os.path.relpath(p, output_dir) for name, p in stems.items()},
+            "files": [{"path": os.path.relpath(p, output_dir), "size": os.path.getsize(p)} for p in files],
+        }
+        return header, files
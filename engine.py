@@ -0,0 +1,751 @@
+import os
+import re
+import sys
+import json
+import shutil
+import importlib
+import threading
+import subprocess
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import soundfile as sf
+
+import audio_probe
+from memory_budget import AdmissionController, MB, model_profile, model_segment
+from silence import find_active_regions, silence_background, blend_region, skipped_fraction
+from progressive import plan_chunks
+from audio_io import decode_range, range_label
+from ingest import IngestState, collect_audio_files, STATE_FILENAME
+from library import StemLibrary, content_fingerprint
+from postprocess import apply_chain, chain_from_config, clear_processed, raw_path, RAW_DIRNAME
+from deadline import DeadlinePlanner, Throughput, default_setting, describe
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+STEM_FOLDERS = {"2": "separated 2 stems", "4": "separated 4 stems", "lite": "separated lite stems"}
+
+
+def resource_path(relative_path):
+    try:
+        base_path = sys._MEIPASS
+    except Exception:
+        base_path = os.path.abspath(".")
+    return os.path.join(base_path, relative_path)
+
+
+def tool_path(relative_path, name):
+    # The bundled binaries are Windows .exe files; everywhere else use whatever is on PATH
+    bundled = resource_path(relative_path)
+    if sys.platform == "win32" and os.path.exists(bundled):
+        return bundled
+    return shutil.which(name) or (bundled if sys.platform == "win32" else name)
+
+
+def format_time(s):
+    m, sec = divmod(int(s), 60)
+    return f"{m}:{sec:02d}"
+
+
+def sanitize_filename(filename):
+    filename = re.sub(r'[<>:"/\\|?*]', '', filename)
+    filename = filename.strip()
+    return filename
+
+class StemEngine:
+    def __init__(self, config_file=None, output_dir=None, on_info=None, on_progress=None, on_reset=None, on_library_changed=None):
+        self.config_file = config_file or os.path.join(APP_DIR, "config.json")
+        # The library and caches belong to the config, so instances run with separate configs don't share them
+        self.data_dir = os.path.dirname(os.path.abspath(self.config_file))
+        os.makedirs(self.data_dir, exist_ok=True)
+        self.tool_cache_file = os.path.join(self.data_dir, "tool_cache.json")
+        audio_probe.configure(
+            cache_file=os.path.join(self.data_dir, "probe_cache.json"),
+            ffprobe_path=tool_path("ffmpeg/bin/ffprobe.exe", "ffprobe")
+        )
+        config = self.load_config()
+        self.on_info = on_info
+        self.on_progress = on_progress
+        self.on_reset = on_reset
+        self.on_library_changed = on_library_changed
+        
+        # Job settings; the GUI copies its widgets into these before each run
+        self.stem_mode = "2"
+        self.quality = "320"
+        self.mode = "download_separate"
+        self.time_range = None
+        self.progressive = False
+        self.post_process = config.get("post_process", True)
+        self.max_jobs = None
+        self.deadline = None
+        self.record_library = True
+        
+        self.library = StemLibrary(os.path.join(self.data_dir, "library.sqlite"))
+        self.set_output_dir(output_dir or config.get("output_dir", os.path.join(os.path.expanduser("~"), "MusicStems")))
+        
+        budget_mb = config.get("ram_budget_mb")
+        self.admission = AdmissionController(
+            budget_bytes=int(budget_mb * MB) if budget_mb else None,
+            calibration=config.get("memory_calibration", 1.0)
+        )
+        self.throughput = Throughput(config.get("throughput"))
+        self._device = None
+        self._models = {}
+        self._model_lock = threading.Lock()
+        self._tool_lock = threading.Lock()
+    
+    @property
+    def device(self):
+        # torch (and demucs) are imported on first use so that front-ends start without them
+        if self._device is None:
+            import torch
+            self._device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+        return self._device
+    
+    def warm_up(self):
+        # The first import of these takes seconds (torch, demucs, numba); pay it before the first job needs it
+        importlib.import_module("librosa.core.audio")
+        try:
+            importlib.import_module("demucs.apply")
+        except ImportError:
+            self.update_info("Demucs/torch is not installed: only Lite stems are available")
+            return
+        self.device
+        config = self.load_config()
+        if config.get("preload_model", False):
+            self.get_model(self.model_name_for(self.stem_mode))
+    
+    def set_output_dir(self, directory):
+        self.output_dir = directory
+        self.ingest_state = IngestState(os.path.join(self.output_dir, STATE_FILENAME))
+    
+    def load_config(self):
+        if os.path.exists(self.config_file):
+            try:
+                with open(self.config_file, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except:
+                pass
+        return {}
+    
+    def save_config(self, **updates):
+        # Only what is passed is written: a one-off --output-dir must not replace the GUI's saved folder
+        config = self.load_config()
+        config.update(updates)
+        try:
+            with open(self.config_file, 'w', encoding='utf-8') as f:
+                json.dump(config, f, indent=4)
+        except:
+            pass
+    
+    def update_info(self, text):
+        if self.on_info:
+            self.on_info(text)
+    
+    def update_progress(self, percent, speed="", eta=""):
+        if self.on_progress:
+            self.on_progress(percent, speed, eta)
+    
+    def reset_progress(self):
+        if self.on_reset:
+            self.on_reset()
+    
+    def check_dependencies(self, need_downloader=True):
+        # Full path to bundled ffmpeg.exe
+        ffmpeg_path = tool_path("ffmpeg/bin/ffmpeg.exe", "ffmpeg")
+        
+        if not self.tool_works(ffmpeg_path, "-version"):
+            return False, "FFmpeg not found. (Bundled version missing?) Install from https://ffmpeg.org"
+        
+        # Full path to bundled yt-dlp.exe
+        ytdlp_path = tool_path("yt-dlp.exe", "yt-dlp")
+        
+        if need_downloader and not self.tool_works(ytdlp_path, "--version"):
+            return False, "yt-dlp not found. Install with: pip install yt-dlp"
+        
+        try:
+            if self.stem_mode != "lite":
+                importlib.import_module("demucs")
+            # Loads (and keeps) the model this job needs, so the check doubles as the warm-up
+            self.get_model(self.model_name_for(self.stem_mode))
+        except Exception as e:
+            return False, f"Demucs not available: {str(e)}. Install: pip install demucs[torch], or use Lite stems"
+        
+        return True, "OK"
+    
+    def tool_works(self, path, *args):
+        # A binary that ran once is trusted until it is replaced (path, size or mtime change)
+        try:
+            st = os.stat(path)
+        except OSError:
+            return False
+        key = f"{os.path.abspath(path)}|{st.st_mtime_ns}|{st.st_size}|{' '.join(args)}"
+        with self._tool_lock:
+            cache = {}
+            if os.path.exists(self.tool_cache_file):
+                try:
+                    with open(self.tool_cache_file, 'r', encoding='utf-8') as f:
+                        cache = json.load(f)
+                except:
+                    cache = {}
+            if cache.get(key):
+                return True
+        try:
+            subprocess.run([path, *args], capture_output=True, check=True)
+        except:
+            return False
+        with self._tool_lock:
+            cache[key] = True
+            try:
+                with open(self.tool_cache_file + ".tmp", 'w', encoding='utf-8') as f:
+                    json.dump(cache, f, indent=2)
+                os.replace(self.tool_cache_file + ".tmp", self.tool_cache_file)
+            except:
+                pass
+        return True
+    
+    def get_model(self, model_name):
+        with self._model_lock:
+            model = self._models.get(model_name)
+            if model is None and model_name == 'lite':
+                from lite_separation import LiteSeparator
+                model = self._models[model_name] = LiteSeparator()
+            if model is None:
+                config = self.load_config()
+                from weight_cache import timed_load
+                model, seconds = timed_load(
+                    model_name,
+                    cache_dir=os.path.join(APP_DIR, "model_cache"),
+                    enabled=config.get("weight_cache", True)
+                )
+                self.update_info(f"Loaded {model_name} in {seconds:.1f}s")
+                model.to(self.device)
+                model.eval()
+                self._models[model_name] = model
+                self.admission.reserve_model(model_name)
+            return model
+    
+    def model_name_for(self, stem_count):
+        if stem_count == "lite":
+            return 'lite'
+        return 'mdx_extra' if stem_count == "2" else 'htdemucs'
+    
+    def ingest_mode(self, time_range=None, stem_count=None):
+        stem_count = stem_count or self.stem_mode
+        if time_range is None:
+            return stem_count
+        return f"{stem_count} {range_label(time_range[0], time_range[1] or 0)}"
+    
+    def separate_stems(self, audio_file, player=None, time_range=None, source=None):
+        try:
+            stem_count = self.stem_mode
+            if stem_count == "lite":
+                self.update_info("Starting quick stem separation (Lite)...")
+            else:
+                self.update_info("Starting stem separation with Demucs... (This may take a while)")
+            
+            song_name = Path(audio_file).stem
+            song_name = sanitize_filename(song_name)
+            
+            info = audio_probe.probe(audio_file)
+            if time_range is not None:
+                range_start = min(time_range[0], info.duration)
+                range_end = min(time_range[1] or info.duration, info.duration)
+                if range_end <= range_start:
+                    raise Exception(f"Range starts after the end of the track ({format_time(info.duration)})")
+                # Decode a little extra on both sides so the model has context at the range edges
+                context = self.load_config().get("range_context", 2.0)
+                load_start = max(0.0, range_start - context)
+                load_end = min(info.duration, range_end + context)
+                song_name = f"{song_name} [{range_label(range_start, range_end)}]"
+            else:
+                load_start, load_end = 0.0, info.duration
+            
+            is_two_stems = stem_count == "2"
+            model_name = self.model_name_for(stem_count)
+            stem_mapping = {'no_vocals': 'instrumental'} if is_two_stems else {}
+            
+            planner = None
+            if self.deadline and stem_count != "lite":
+                planner = DeadlinePlanner(
+                    self.deadline, stem_count, self.throughput, self.device.type,
+                    loaded=self._models, reserve=self.load_config().get("deadline_reserve", 0.15)
+                )
+                setting = planner.choose(load_end - load_start)
+                model_name = setting.model
+                self.update_info(f"⏱ {format_time(self.deadline)} deadline: starting with {describe(setting)}")
+            
+            model = self.get_model(model_name)
+            progressive = player is not None and self.progressive and time_range is None
+            
+            plan = self.admission.plan(
+                load_end - load_start, model_name,
+                input_sample_rate=info.sample_rate, input_channels=info.channels
+            )
+            segment = self.segment_for(model_name, model, plan.segment)
+            
+            subfolder = self.stem_subfolder(song_name, stem_count)
+            
+            with self.admission.admitted(plan) as admission:
+                if time_range is not None:
+                    ffmpeg_path = tool_path("ffmpeg/bin/ffmpeg.exe", "ffmpeg")
+                    y, sample_rate = decode_range(audio_file, load_start, load_end, ffmpeg_path)
+                    if sample_rate != 44100:
+                        import librosa
+                        y = librosa.resample(y, orig_sr=sample_rate, target_sr=44100)
+                        sample_rate = 44100
+                else:
+                    y, sample_rate = self.load_waveform(audio_file)
+                on_progress = None
+                if progressive:
+                    planned = {stem_mapping.get(st, st): os.path.join(subfolder, f"{st}.wav") for st in model.sources}
+                    on_progress = player.begin_progressive_stems(planned, y.shape[-1], sample_rate)
+                sources = self.run_model(model, y, sample_rate, segment, progressive, on_progress, model_name, planner)
+                del y
+                if time_range is not None:
+                    first = int(round((range_start - load_start) * sample_rate))
+                    last = first + int(round((range_end - range_start) * sample_rate))
+                    sources = sources[..., first:last]
+                
+                stems = self.write_stems(model, sources, subfolder, sample_rate, stem_mapping)
+                del sources
+            
+            self.update_info(admission.report())
+            if stem_count == "lite" and not self.load_config().get("lite_post_process", False):
+                # The pydub chain takes far longer than the lite split itself; Re-process applies it on demand
+                apply_chain(subfolder, [])
+            else:
+                self.post_process_stems(subfolder)
+            if planner is not None:
+                model_name = planner.models()
+                self.update_info(planner.summary())
+            self.record_in_library(
+                audio_file, stems, model_name, self.ingest_mode(time_range), source,
+                duration=(range_end - range_start) if time_range is not None else info.duration
+            )
+            
+            self.update_info("✅ Stem separation completed!")
+            if player is not None:
+                player.show_stems(stems, rebuild_ui=not progressive)
+            return stems
+            
+        except Exception as e:
+            raise Exception(f"Stem separation error: {str(e)}")
+    
+    def record_in_library(self, audio_file, stems, model_name, stem_mode, source=None, duration=None):
+        if not self.record_library:
+            return
+        # The stems are already on disk; a failed index update must not fail the job
+        try:
+            self.library.add(
+                os.path.basename(os.path.dirname(os.path.dirname(next(iter(stems.values()))))),
+                stems,
+                source=source or os.path.abspath(audio_file),
+                fingerprint=content_fingerprint(audio_file),
+                model=model_name,
+                stem_mode=stem_mode,
+                duration=duration,
+                sample_rate=44100
+            )
+            if self.on_library_changed:
+                self.on_library_changed()
+        except Exception as e:
+            self.update_info(f"Warning: Could not update library: {e}")
+    
+    def stem_subfolder(self, song_name, stem_count):
+        subfolder = os.path.join(self.output_dir, song_name, STEM_FOLDERS[stem_count])
+        os.makedirs(subfolder, exist_ok=True)
+        return subfolder
+    
+    def load_waveform(self, audio_file):
+        import librosa
+        y, sample_rate = librosa.load(audio_file, sr=None, mono=False)
+        if len(y.shape) == 1:
+            y = np.stack([y, y])
+        if sample_rate != 44100:
+            y = librosa.resample(y, orig_sr=sample_rate, target_sr=44100)
+            sample_rate = 44100
+        return np.ascontiguousarray(y, dtype=np.float32), sample_rate
+    
+    def write_stems(self, model, sources, subfolder, sample_rate, stem_mapping):
+        # Raw model output is kept so post-processing can be re-tuned without separating again
+        os.makedirs(os.path.join(subfolder, RAW_DIRNAME), exist_ok=True)
+        clear_processed(subfolder)
+        stems = {}
+        for i, stem in enumerate(model.sources):
+            stem_file = os.path.join(subfolder, f"{stem}.wav")
+            sf.write(raw_path(subfolder, f"{stem}.wav"), sources[i].T, sample_rate)
+            
+            mapped_stem = stem_mapping.get(stem, stem)
+            stems[mapped_stem] = stem_file
+        return stems
+    
+    def batch_plan(self, paths):
+        model_name = self.model_name_for(self.stem_mode)
+        durations = [audio_probe.probe(path).duration for path in paths]
+        window = model_segment(self.get_model(model_name)) or 10.0
+        return self.admission.plan_batch(durations, model_name, window, self.load_config().get("batch_size", 8))
+    
+    def separate_batch(self, paths, plan):
+        stem_count = self.stem_mode
+        is_two_stems = stem_count == "2"
+        stem_mapping = {'no_vocals': 'instrumental'} if is_two_stems else {}
+        model = self.get_model(self.model_name_for(stem_count))
+        config = self.load_config()
+        
+        from batched_inference import BatchScheduler
+        scheduler = BatchScheduler(
+            model, self.device, batch_size=plan.batch_size,
+            silence_fill=config.get("silence_fill", "zeros")
+        )
+        failures = {}
+        # A batch measures several clips at once, so it is admitted but not used to calibrate single-track estimates
+        with self.admission.admitted(plan, calibrate=False) as admission:
+            silent = 0.0
+            for path in paths:
+                try:
+                    y, _ = self.load_waveform(path)
+                    regions = None
+                    if config.get("silence_skip", True):
+                        regions = find_active_regions(
+                            y, 44100,
+                            threshold_db=config.get("silence_threshold_db", -60.0),
+                            min_silence=config.get("silence_min_duration", 2.0),
+                            pad=config.get("silence_pad", 0.5)
+                        )
+                        silent += skipped_fraction(regions, y.shape[-1]) * y.shape[-1] / 44100
+                    scheduler.add(path, y, regions)
+                except Exception as e:
+                    failures[path] = e
+            
+            self.update_info(f"Separating {len(scheduler.tracks)} short clip(s) in batches of {scheduler.batch_size}...")
+            results = scheduler.run(progress=lambda done, total: self.update_progress(done / total * 100))
+        self.update_info(admission.report())
+        if silent > 0:
+            self.update_info(f"Skipped {silent:.1f}s of silence")
+        
+        separated = {}
+        for path, sources in results.items():
+            try:
+                subfolder = self.stem_subfolder(sanitize_filename(Path(path).stem), stem_count)
+                stems = self.write_stems(model, sources, subfolder, 44100, stem_mapping)
+                self.post_process_stems(subfolder)
+                self.record_in_library(path, stems, self.model_name_for(stem_count), stem_count, duration=sources.shape[-1] / 44100)
+                separated[path] = stems
+            except Exception as e:
+                failures[path] = e
+        return separated, failures
+    
+    def batch_groups(self, paths):
+        config = self.load_config()
+        max_clip = config.get("batch_clip_max_seconds", 60.0)
+        max_group = config.get("batch_group_seconds", 600.0)
+        groups = []
+        rest = []
+        group = []
+        group_seconds = 0.0
+        for path in paths:
+            try:
+                duration = audio_probe.probe(path).duration
+            except Exception:
+                rest.append(path)
+                continue
+            if duration > max_clip:
+                rest.append(path)
+                continue
+            if group and group_seconds + duration > max_group:
+                groups.append(group)
+                group = []
+                group_seconds = 0.0
+            group.append(path)
+            group_seconds += duration
+        if group:
+            groups.append(group)
+        # A lone short clip gains nothing from batching
+        if len(groups) == 1 and len(groups[0]) == 1:
+            return [], rest + groups[0]
+        return groups, rest
+    
+    def segment_for(self, model_name, model, planned):
+        # The admitted segment may belong to another model (deadline fallback); never exceed this one's
+        limits = [planned, model_profile(model_name)['max_segment'], model_segment(model)]
+        return min(s for s in limits if s)
+    
+    def precision_context(self, precision):
+        import contextlib
+        import torch
+        if precision == "fp32":
+            return contextlib.nullcontext()
+        return torch.autocast(device_type=self.device.type, dtype=torch.float16)
+    
+    def run_model(self, model, y, sample_rate, segment, progressive=False, on_progress=None, model_name=None, planner=None):
+        if model_name == 'lite':
+            # Many times real-time on the whole track at once; chunking and silence skipping would only add seams
+            sources = model.separate(y, sample_rate)
+            if on_progress is not None:
+                on_progress(sources, 0, y.shape[-1])
+            return sources
+        import time
+        import torch
+        from demucs.apply import apply_model
+        config = self.load_config()
+        n_sources = len(model.sources)
+        total = y.shape[-1]
+        if config.get("silence_skip", True):
+            pad = config.get("silence_pad", 0.5)
+            regions = find_active_regions(
+                y, sample_rate,
+                threshold_db=config.get("silence_threshold_db", -60.0),
+                min_silence=config.get("silence_min_duration", 2.0),
+                pad=pad
+            )
+        else:
+            pad = 0.0
+            regions = [(0, total)]
+        
+        sources = silence_background(y, n_sources, config.get("silence_fill", "zeros"))
+        published = 0
+        # A deadline needs the track in pieces so the settings can be re-planned as it goes
+        chunks = plan_chunks(regions, total, sample_rate, region_pad=pad, progressive=progressive or planner is not None)
+        setting = default_setting(model_name)
+        for i, chunk in enumerate(chunks):
+            chunk_seconds = (chunk.in_end - chunk.in_start) / sample_rate
+            if planner is not None:
+                remaining = sum(c.in_end - c.in_start for c in chunks[i:]) / sample_rate
+                planned = planner.choose(remaining)
+                if planned != setting and i > 0:
+                    self.update_info(f"⏱ {planner.remaining():.0f}s left for {remaining:.0f}s of audio: switching to {describe(planned)}")
+                setting = planned
+                model = self.get_model(setting.model)
+            chunk_segment = self.segment_for(setting.model, model, segment)
+            started = time.time()
+            waveform = torch.from_numpy(y[:, chunk.in_start:chunk.in_end]).to(self.device)
+            with torch.no_grad(), self.precision_context(setting.precision):
+                out = apply_model(
+                    model, waveform.unsqueeze(0), device=self.device, split=True,
+                    overlap=setting.overlap, shifts=setting.shifts, segment=chunk_segment, progress=True
+                )[0]
+            out = out.float().cpu().numpy()[..., chunk.write_start - chunk.in_start:chunk.write_end - chunk.in_start]
+            if model_name is not None:
+                self.throughput.record(setting, chunk_seconds, time.time() - started, self.device.type)
+            blend_region(sources, out, chunk.write_start, chunk.fade_in, chunk.fade_out)
+            del waveform, out
+            if on_progress is not None and chunk.final_until > published:
+                on_progress(sources, published, chunk.final_until)
+                published = chunk.final_until
+        if on_progress is not None and published < total:
+            on_progress(sources, published, total)
+        
+        skipped = skipped_fraction(regions, total)
+        if skipped > 0:
+            self.update_info(f"Skipped {skipped * total / sample_rate:.1f}s of silence ({skipped * 100:.0f}% of inference)")
+        return sources
+    
+    def parallel_workers(self, paths, stem_count):
+        if len(paths) < 2 or (stem_count != "lite" and self.device.type == 'cuda'):
+            return 1
+        durations = []
+        for path in paths:
+            try:
+                durations.append(audio_probe.probe(path).duration)
+            except Exception:
+                pass
+        if not durations:
+            return 1
+        plan = self.admission.plan(max(durations), self.model_name_for(stem_count))
+        limit = self.max_jobs or self.load_config().get("max_parallel_jobs", max(1, (os.cpu_count() or 1) // 4))
+        return min(len(paths), self.admission.max_concurrent(plan.predicted_bytes, limit))
+    
+    def post_process_chain(self):
+        config = self.load_config()
+        config["post_process"] = self.post_process
+        return chain_from_config(config)
+    
+    def post_process_stems(self, output_path):
+        return apply_chain(output_path, self.post_process_chain())
+    
+    def download_audio(self, url, quality):
+        ytdlp_path = tool_path("yt-dlp.exe", "yt-dlp")
+        
+        song_id = re.sub(r'[^a-zA-Z0-9]', '_', url.split('/')[-1]) if '/' in url else 'audio'
+        temp_subdir = os.path.join(self.output_dir, f"temp_{song_id}")
+        os.makedirs(temp_subdir, exist_ok=True)
+        
+        cmd = [
+            ytdlp_path,  
+            "-f", f"bestaudio[abr<={quality}]/best",
+            "--audio-format", "mp3",
+            "--audio-quality", f"{quality}K",
+            "--postprocessor-args", "-ar 44100",
+            "-o", os.path.join(temp_subdir, "%(title)s.%(ext)s"),
+            "--verbose",  
+            url
+        ]
+        
+        try:
+            process = subprocess.Popen(
+                cmd,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,  
+                universal_newlines=True,  
+                bufsize=1  
+            )
+            
+            full_output = []  
+            percent = 0
+            
+            for line in process.stdout:
+                line = line.strip()
+                full_output.append(line)
+                self.update_info(line)  
+                
+                if "%" in line:
+                    percent_match = re.search(r'(\d+(?:\.\d+)?)%', line)
+                    if percent_match:
+                        percent = float(percent_match.group(1))
+                        self.update_progress(percent)
+                elif "download" in line.lower():
+                    self.update_info(line)
+            
+            process.wait()
+            
+            if process.returncode != 0:
+                log_file = os.path.join(temp_subdir, f"temp_{song_id}_log.txt")
+                try:
+                    with open(log_file, 'w', encoding='utf-8') as f:
+                        f.write("\n".join(full_output))
+                except Exception as log_err:
+                    self.update_info(f"Warning: Could not save log: {log_err}")
+                error_msg = "\n".join(full_output[-20:])  
+                raise Exception(f"yt-dlp failed (code {process.returncode}):\n{error_msg}\nFull log saved to {log_file}")
+            
+        except Exception as e:
+            raise Exception(f"Subprocess error: {e}")
+        
+        extensions = ['.mp3', '.m4a', '.webm', '.opus', '.flac', '.wav', '.mka']
+        files = [f for f in os.listdir(temp_subdir) if any(f.lower().endswith(ext) for ext in extensions) and not f.startswith('.')]
+        
+        if not files:
+            raise Exception(f"No audio file downloaded. Check temp dir: {temp_subdir}. Available files: {os.listdir(temp_subdir)}")
+        
+        latest_file = max(files, key=lambda f: os.path.getctime(os.path.join(temp_subdir, f)))
+        downloaded_path = os.path.join(temp_subdir, latest_file)
+        
+        final_name = sanitize_filename(Path(latest_file).stem) + Path(latest_file).suffix
+        final_path = os.path.join(self.output_dir, final_name)
+        os.rename(downloaded_path, final_path)
+        
+        for item in os.listdir(temp_subdir):
+            os.remove(os.path.join(temp_subdir, item))
+        os.rmdir(temp_subdir)
+        
+        self.update_info(f"Downloaded: {final_name}")
+        return final_path
+    
+    def parse_sources(self, items):
+        urls = []
+        local_paths = []
+        for line in items:
+            item = line.strip().strip('"')
+            if not item:
+                continue
+            if item.startswith('http'):
+                urls.append(item)
+            elif os.path.exists(item):
+                local_paths.append(item)
+        return urls, collect_audio_files(local_paths)
+    
+    def run(self, urls, local_files, player=None):
+        if not urls and not local_files:
+            raise Exception("⚠️ Please enter valid URL(s) or local audio files")
+        
+        success, message = self.check_dependencies(need_downloader=bool(urls))
+        if not success:
+            raise Exception(message)
+        
+        time_range = self.time_range
+        stem_mode = self.ingest_mode(time_range)
+        
+        # Local files are always separated; only new or changed ones are re-run
+        pending = self.ingest_state.pending(local_files, stem_mode)
+        skipped = len(local_files) - len(pending)
+        
+        total = len(urls) + len(pending)
+        failed = []
+        for idx, url in enumerate(urls, 1):
+            self.update_info(f"Processing {idx}/{total}: Downloading...")
+            self.reset_progress()
+            
+            audio_file = self.download_audio(url, self.quality)
+            self.update_progress(100)
+            
+            if self.mode == "download_separate":
+                self.update_info(f"Processing {idx}/{total}: Separating stems...")
+                self.separate_stems(audio_file, player=player, time_range=time_range, source=url)
+        
+        last_stems = None
+        # Batched clips run with fixed settings, so a deadline is applied one file at a time
+        if time_range is None and self.deadline is None and self.stem_mode != "lite" and len(pending) > 1:
+            # Short clips are packed together into batched model calls
+            groups, pending = self.batch_groups(pending)
+            for group in groups:
+                self.reset_progress()
+                try:
+                    plan = self.batch_plan(group)
+                    if not plan.fits:
+                        # Too much for the memory budget at once; these clips go through the single-track path
+                        self.update_info(f"{len(group)} short clip(s) don't fit the memory budget together, separating them one at a time")
+                        pending.extend(group)
+                        continue
+                    separated, failures = self.separate_batch(group, plan)
+                except Exception as e:
+                    # A failed batch fails its clips, not the whole run
+                    separated, failures = {}, {path: e for path in group}
+                for path, stems in separated.items():
+                    self.ingest_state.mark_processed(path, stem_mode, os.path.dirname(next(iter(stems.values()))))
+                    last_stems = stems
+                for path, e in failures.items():
+                    self.ingest_state.mark_failed(path, stem_mode, e)
+                    failed.append(f"{os.path.basename(path)}: {e}")
+        
+        workers = self.parallel_workers(pending, self.stem_mode)
+        
+        def separate_local(idx, path):
+            self.update_info(f"Processing {idx}/{total}: Separating {os.path.basename(path)}...")
+            try:
+                stems = self.separate_stems(path, player=player if workers == 1 else None, time_range=time_range)
+                self.ingest_state.mark_processed(path, stem_mode, os.path.dirname(next(iter(stems.values()))))
+                return stems
+            except Exception as e:
+                self.ingest_state.mark_failed(path, stem_mode, e)
+                failed.append(f"{os.path.basename(path)}: {e}")
+                return None
+        
+        if workers > 1:
+            self.update_info(f"Separating {len(pending)} file(s), {workers} at a time within the memory budget")
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(separate_local, range(total - len(pending) + 1, total + 1), pending))
+            finished = [r for r in results if r]
+            if finished:
+                last_stems = finished[-1]
+        else:
+            for idx, path in enumerate(pending, total - len(pending) + 1):
+                self.reset_progress()
+                if separate_local(idx, path) and player is not None:
+                    # Sequential jobs load the player themselves
+                    last_stems = None
+        if last_stems and player is not None:
+            player.show_stems(last_stems)
+        self.save_config(memory_calibration=self.admission.calibrations, throughput=self.throughput.table)
+        
+        self.update_info("🎉 All processing completed!" if not failed else f"⚠️ Completed with {len(failed)} failure(s)")
+        return total, skipped, failed
+    
+    def summarize(self, total, skipped, failed):
+        summary = f"Processed {total - len(failed)} track(s) successfully!"
+        if skipped:
+            summary += f"\nSkipped {skipped} unchanged file(s)."
+        if failed:
+            summary += f"\nFailed {len(failed)} file(s):\n" + "\n".join(failed[:10])
+        return summary
@@ -0,0 +1,264 @@
+import os
+import sys
+import json
+import time
+import argparse
+import itertools
+import contextlib
+
+import numpy as np
+import soundfile as sf
+
+from memory_budget import PeakMemoryMonitor, MB, model_segment
+from lite_separation import LiteSeparator
+
+SAMPLE_RATE = 44100
+
+
+def sdr(reference, estimate):
+    num = np.sum(reference ** 2)
+    den = np.sum((reference - estimate) ** 2)
+    return 10 * np.log10((num + 1e-10) / (den + 1e-10))
+
+
+def si_sdr(reference, estimate):
+    reference = reference.reshape(-1)
+    estimate = estimate.reshape(-1)
+    alpha = np.dot(estimate, reference) / (np.dot(reference, reference) + 1e-10)
+    target = alpha * reference
+    return 10 * np.log10((np.sum(target ** 2) + 1e-10) / (np.sum((estimate - target) ** 2) + 1e-10))
+
+
+def synthetic_track(seed, seconds=20.0, sr=SAMPLE_RATE):
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * sr)) / sr
+    f0 = rng.uniform(180, 330)
+    vibrato = 1 + 0.01 * np.sin(2 * np.pi * 5.5 * t)
+    phase = 2 * np.pi * f0 * np.cumsum(vibrato) / sr
+    vocals = sum(np.sin(k * phase) / k for k in range(1, 8)) * (0.5 + 0.5 * np.sin(2 * np.pi * 0.25 * t) ** 2)
+
+    drums = np.zeros_like(t)
+    beat = int(sr * 60 / rng.uniform(90, 130))
+    hit = np.exp(-np.arange(int(0.15 * sr)) / (0.03 * sr))
+    for start in range(0, len(t) - len(hit), beat):
+        drums[start:start + len(hit)] += hit * (rng.standard_normal(len(hit)) * 0.6 + np.sin(2 * np.pi * 60 * np.arange(len(hit)) / sr))
+
+    bass_f = rng.choice([41.2, 49.0, 55.0, 61.7])
+    bass = np.sin(2 * np.pi * bass_f * t) * 0.8
+
+    chord = rng.choice([261.6, 293.7, 329.6, 349.2], size=3, replace=False)
+    other = sum(np.sign(np.sin(2 * np.pi * f * t)) * 0.08 for f in chord)
+
+    stems = {'vocals': vocals, 'drums': drums, 'bass': bass, 'other': other}
+    pan = {'vocals': 0.5, 'drums': 0.5, 'bass': 0.5, 'other': 0.3}
+    out = {}
+    for name, y in stems.items():
+        y = y / (np.max(np.abs(y)) + 1e-9) * 0.25
+        out[name] = np.stack([y * (1 - pan[name]) * 2, y * pan[name] * 2]).astype(np.float32)
+    return out
+
+
+def load_track(folder):
+    stems = {}
+    for f in sorted(os.listdir(folder)):
+        name, ext = os.path.splitext(f)
+        if ext.lower() not in ('.wav', '.flac') or name == 'mixture':
+            continue
+        y, sr = sf.read(os.path.join(folder, f), dtype='float32', always_2d=True)
+        y = y.T
+        if y.shape[0] == 1:
+            y = np.repeat(y, 2, axis=0)
+        if sr != SAMPLE_RATE:
+            import librosa
+            y = librosa.resample(y, orig_sr=sr, target_sr=SAMPLE_RATE)
+        stems[name] = y[:2]
+    length = min(y.shape[-1] for y in stems.values())
+    return {k: v[:, :length] for k, v in stems.items()}
+
+
+def load_tracks(args):
+    tracks = {}
+    if args.stems_dir:
+        for name in sorted(os.listdir(args.stems_dir)):
+            folder = os.path.join(args.stems_dir, name)
+            if os.path.isdir(folder):
+                stems = load_track(folder)
+                if stems:
+                    tracks[name] = stems
+    for i in range(args.synthetic):
+        tracks[f"synthetic_{i}"] = synthetic_track(i, args.synthetic_seconds)
+    if args.max_seconds:
+        n = int(args.max_seconds * SAMPLE_RATE)
+        tracks = {k: {s: y[:, :n] for s, y in v.items()} for k, v in tracks.items()}
+    return tracks
+
+
+def precision_context(precision, device):
+    import torch
+    if precision == "fp32":
+        return contextlib.nullcontext()
+    dtype = torch.bfloat16 if precision == "bf16" else torch.float16
+    return torch.autocast(device_type=device.type, dtype=dtype)
+
+
+def score_track(references, estimates):
+    # Always score vocals/accompaniment so 2-stem and 4-stem configurations are comparable
+    pairs = {}
+    if 'vocals' in references and 'vocals' in estimates:
+        pairs['vocals'] = (references['vocals'], estimates['vocals'])
+        accompaniment_ref = [y for k, y in references.items() if k != 'vocals']
+        accompaniment_est = [y for k, y in estimates.items() if k != 'vocals']
+        if accompaniment_ref and accompaniment_est:
+            pairs['accompaniment'] = (sum(accompaniment_ref), sum(accompaniment_est))
+    for stem in ('drums', 'bass', 'other'):
+        if stem in references and stem in estimates:
+            pairs[stem] = (references[stem], estimates[stem])
+    return {name: {'sdr': float(sdr(ref, est)), 'si_sdr': float(si_sdr(ref, est))} for name, (ref, est) in pairs.items()}
+
+
+def run_config(config, model, tracks, device):
+    per_track = {}
+    runtime = 0.0
+    audio_seconds = 0.0
+    peak = 0
+    for name, references in tracks.items():
+        mix = sum(references.values())
+        if isinstance(model, LiteSeparator):
+            with PeakMemoryMonitor() as monitor:
+                start = time.time()
+                sources = model.separate(mix, SAMPLE_RATE)
+                runtime += time.time() - start
+            estimates = {s: sources[i] for i, s in enumerate(model.sources)}
+        else:
+            import torch
+            from demucs.apply import apply_model
+            mix_tensor = torch.from_numpy(np.ascontiguousarray(mix)).to(device)
+            with PeakMemoryMonitor() as monitor:
+                start = time.time()
+                with torch.no_grad(), precision_context(config['precision'], device):
+                    sources = apply_model(
+                        model, mix_tensor.unsqueeze(0), device=device, split=True,
+                        overlap=config['overlap'], shifts=config['shifts'], segment=config['segment']
+                    )[0]
+                if device.type == 'cuda':
+                    torch.cuda.synchronize()
+                runtime += time.time() - start
+            estimates = {s: sources[i].float().cpu().numpy() for i, s in enumerate(model.sources)}
+        peak = max(peak, monitor.peak_delta or 0)
+        audio_seconds += mix.shape[-1] / SAMPLE_RATE
+        per_track[name] = score_track(references, estimates)
+
+    stems = sorted({s for scores in per_track.values() for s in scores})
+    summary = {}
+    for stem in stems:
+        values = [scores[stem] for scores in per_track.values() if stem in scores]
+        summary[stem] = {
+            'sdr': float(np.median([v['sdr'] for v in values])),
+            'si_sdr': float(np.median([v['si_sdr'] for v in values])),
+        }
+    headline = [summary[s]['sdr'] for s in ('vocals', 'accompaniment') if s in summary]
+    mean_sdr = float(np.mean(headline)) if headline else float('nan')
+    return {
+        'config': config,
+        'runtime_seconds': runtime,
+        'realtime_factor': audio_seconds / runtime if runtime > 0 else None,
+        'peak_memory_mb': peak / MB,
+        'mean_sdr': mean_sdr,
+        'stems': summary,
+        'tracks': per_track,
+    }
+
+
+def mark_pareto(results):
+    for r in results:
+        r['pareto'] = not any(
+            o is not r
+            and o['runtime_seconds'] <= r['runtime_seconds']
+            and o['mean_sdr'] >= r['mean_sdr']
+            and (o['runtime_seconds'] < r['runtime_seconds'] or o['mean_sdr'] > r['mean_sdr'])
+            for o in results
+        )
+    return results
+
+
+def print_table(results):
+    stems = sorted({s for r in results for s in r['stems']})
+    header = ["model", "overlap", "segment", "shifts", "prec", "time s", "x RT", "peak MB", "mean SDR"]
+    header += [f"{s} SDR/SI-SDR" for s in stems] + ["pareto"]
+    rows = []
+    for r in sorted(results, key=lambda r: r['runtime_seconds']):
+        c = r['config']
+        row = [
+            c['model'], f"{c['overlap']:g}", f"{c['segment']:g}" if c['segment'] else "default", str(c['shifts']), c['precision'],
+            f"{r['runtime_seconds']:.1f}", f"{r['realtime_factor']:.2f}" if r['realtime_factor'] else "-",
+            f"{r['peak_memory_mb']:.0f}", f"{r['mean_sdr']:.2f}",
+        ]
+        for s in stems:
+            v = r['stems'].get(s)
+            row.append(f"{v['sdr']:.2f}/{v['si_sdr']:.2f}" if v else "-")
+        row.append("*" if r['pareto'] else "")
+        rows.append(row)
+    widths = [max(len(h), *(len(row[i]) for row in rows)) for i, h in enumerate(header)]
+    print("  ".join(h.ljust(w) for h, w in zip(header, widths)))
+    print("  ".join("-" * w for w in widths))
+    for row in rows:
+        print("  ".join(v.ljust(w) for v, w in zip(row, widths)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure separation quality (SDR/SI-SDR) against runtime and memory.")
+    parser.add_argument("--stems-dir", help="Folder of tracks, each a folder of reference stems (vocals.wav, drums.wav, ...)")
+    parser.add_argument("--synthetic", type=int, default=0, help="Number of synthetic tracks to generate")
+    parser.add_argument("--synthetic-seconds", type=float, default=20.0)
+    parser.add_argument("--max-seconds", type=float, default=None, help="Truncate every track to this length")
+    parser.add_argument("--models", nargs="+", default=["htdemucs", "mdx_extra"], help="'lite' runs the torch-free engine")
+    parser.add_argument("--overlaps", nargs="+", type=float, default=[0.25, 0.1])
+    parser.add_argument("--segments", nargs="+", type=float, default=[0], help="Segment lengths in seconds (0 = model default)")
+    parser.add_argument("--shifts", nargs="+", type=int, default=[1, 0])
+    parser.add_argument("--precisions", nargs="+", choices=["fp32", "bf16", "fp16"], default=["fp32"])
+    parser.add_argument("--output", default="evaluation.json")
+    parser.add_argument("--model-cache", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "model_cache"),
+                        help="Memory-mapped weight cache folder ('' to load through demucs every time)")
+    args = parser.parse_args(argv)
+
+    tracks = load_tracks(args)
+    if not tracks:
+        parser.error("No tracks: pass --stems-dir and/or --synthetic N")
+
+    # torch and demucs are only needed for the demucs models; 'lite' also runs without them
+    device = None
+    results = []
+    for model_name in args.models:
+        if model_name == "lite":
+            config = {'model': 'lite', 'overlap': 0.0, 'segment': None, 'shifts': 0, 'precision': 'fp32'}
+            print(f"Running {config} on {len(tracks)} track(s)...", file=sys.stderr)
+            results.append(run_config(config, LiteSeparator(), tracks, device))
+            continue
+        if device is None:
+            import torch
+            device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+        from weight_cache import timed_load
+        model, seconds = timed_load(model_name, args.model_cache)
+        print(f"Loaded {model_name} in {seconds:.2f}s", file=sys.stderr)
+        model.to(device)
+        model.eval()
+        max_segment = model_segment(model)
+        for overlap, segment, shifts, precision in itertools.product(args.overlaps, args.segments, args.shifts, args.precisions):
+            if precision == "fp16" and device.type != 'cuda':
+                continue
+            if segment and max_segment and segment > max_segment:
+                continue
+            config = {'model': model_name, 'overlap': overlap, 'segment': segment or None, 'shifts': shifts, 'precision': precision}
+            print(f"Running {config} on {len(tracks)} track(s)...", file=sys.stderr)
+            results.append(run_config(config, model, tracks, device))
+        del model
+
+    mark_pareto(results)
+    print_table(results)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump({'device': device.type if device is not None else 'cpu', 'tracks': sorted(tracks), 'results': results}, f, indent=2)
+    print(f"\nResults written to {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
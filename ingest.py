@@ -0,0 +1,184 @@
+import os
+import json
+import time
+import threading
+
+AUDIO_EXTENSIONS = ('.mp3', '.wav', '.flac', '.ogg', '.m4a', '.opus', '.aiff', '.aif', '.webm', '.mka')
+
+STATE_FILENAME = ".ingest_state.json"
+
+
+def is_audio_file(path):
+    name = os.path.basename(path)
+    return not name.startswith('.') and name.lower().endswith(AUDIO_EXTENSIONS)
+
+
+def _skip_dir(name):
+    # Our own output folders and yt-dlp temp folders must never be fed back in
+    return name.startswith('.') or name.startswith('temp_') or name.startswith('separated ')
+
+
+def scan_folder(folder, recursive=True):
+    found = []
+    for root, dirs, files in os.walk(folder):
+        dirs[:] = sorted(d for d in dirs if not _skip_dir(d))
+        for f in sorted(files):
+            if is_audio_file(f):
+                found.append(os.path.abspath(os.path.join(root, f)))
+        if not recursive:
+            break
+    return found
+
+
+def collect_audio_files(paths, recursive=True):
+    files = []
+    seen = set()
+    for p in paths:
+        if os.path.isdir(p):
+            candidates = scan_folder(p, recursive)
+        elif os.path.isfile(p) and is_audio_file(p):
+            candidates = [os.path.abspath(p)]
+        else:
+            candidates = []
+        for c in candidates:
+            if c not in seen:
+                seen.add(c)
+                files.append(c)
+    return files
+
+
+def file_signature(path):
+    st = os.stat(path)
+    return {"size": st.st_size, "mtime": st.st_mtime_ns}
+
+
+class IngestState:
+    def __init__(self, state_file):
+        self.state_file = state_file
+        self.lock = threading.Lock()
+        self.files = {}
+        self.load()
+
+    def load(self):
+        if os.path.exists(self.state_file):
+            try:
+                with open(self.state_file, 'r', encoding='utf-8') as f:
+                    self.files = json.load(f).get("files", {})
+            except:
+                self.files = {}
+
+    def save(self):
+        with self.lock:
+            data = {"version": 1, "files": self.files}
+            folder = os.path.dirname(self.state_file)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            tmp_path = self.state_file + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2)
+            os.replace(tmp_path, self.state_file)
+
+    def needs_processing(self, path, stem_mode, retry_failed=True):
+        path = os.path.abspath(path)
+        try:
+            sig = file_signature(path)
+        except OSError:
+            return False
+        with self.lock:
+            entry = self.files.get(path)
+        if entry is None:
+            return True
+        if entry.get("size") != sig["size"] or entry.get("mtime") != sig["mtime"]:
+            return True
+        if entry.get("stem_mode") != stem_mode:
+            return True
+        if entry.get("status") == "failed":
+            return retry_failed
+        return entry.get("status") != "done"
+
+    def _record(self, path, stem_mode, **fields):
+        path = os.path.abspath(path)
+        try:
+            sig = file_signature(path)
+        except OSError:
+            sig = {"size": None, "mtime": None}
+        entry = {"size": sig["size"], "mtime": sig["mtime"], "stem_mode": stem_mode, "updated_at": time.time()}
+        entry.update(fields)
+        with self.lock:
+            self.files[path] = entry
+        self.save()
+
+    def mark_processed(self, path, stem_mode, output_path):
+        self._record(path, stem_mode, status="done", output=output_path)
+
+    def mark_failed(self, path, stem_mode, error):
+        self._record(path, stem_mode, status="failed", error=str(error))
+
+    def pending(self, paths, stem_mode, retry_failed=True):
+        return [p for p in paths if self.needs_processing(p, stem_mode, retry_failed)]
+
+
+class FolderWatcher(threading.Thread):
+    def __init__(self, folder, on_new_files, state=None, stem_mode_getter=None, interval=5.0, recursive=True):
+        super().__init__(daemon=True)
+        self.folder = folder
+        self.on_new_files = on_new_files
+        self.state = state
+        self.stem_mode_getter = stem_mode_getter
+        self.interval = interval
+        self.recursive = recursive
+        self._stop_event = threading.Event()
+        self._last_seen = {}
+        self._reported = {}
+        self._lock = threading.Lock()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def forget(self, paths):
+        # A batch that aborted before recording its files: report them again on the next poll.
+        # Files it did record are filtered by the ingest state as usual
+        with self._lock:
+            for path in paths:
+                self._reported.pop(os.path.abspath(path), None)
+
+    def poll(self):
+        current = {}
+        for path in scan_folder(self.folder, self.recursive):
+            try:
+                sig = file_signature(path)
+            except OSError:
+                continue
+            current[path] = (sig["size"], sig["mtime"])
+
+        ready = []
+        with self._lock:
+            for path, sig in current.items():
+                # A file still being copied onto the share changes between polls; wait until it settles
+                if self._last_seen.get(path) != sig:
+                    continue
+                if self._reported.get(path) == sig:
+                    continue
+                self._reported[path] = sig
+                if self.state is not None and self.stem_mode_getter is not None:
+                    if not self.state.needs_processing(path, self.stem_mode_getter(), retry_failed=False):
+                        continue
+                ready.append(path)
+
+            self._last_seen = current
+            for path in list(self._reported):
+                if path not in current:
+                    del self._reported[path]
+        return ready
+
+    def run(self):
+        while not self._stop_event.is_set():
+            ready = []
+            try:
+                ready = self.poll()
+                if ready:
+                    self.on_new_files(ready)
+            except Exception as e:
+                print("Watch folder error:", e)
+                self.forget(ready)
+            self._stop_event.wait(self.interval)
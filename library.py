@@ -0,0 +1,175 @@
+import os
+import time
+import hashlib
+import sqlite3
+import threading
+
+import soundfile as sf
+
+from mix_renderer import discover_tracks
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tracks (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    source TEXT,
+    fingerprint TEXT,
+    model TEXT,
+    stem_mode TEXT,
+    duration REAL,
+    sample_rate INTEGER,
+    folder TEXT NOT NULL UNIQUE,
+    added REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tracks_name ON tracks (name COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS tracks_added ON tracks (added);
+CREATE INDEX IF NOT EXISTS tracks_fingerprint ON tracks (fingerprint);
+CREATE TABLE IF NOT EXISTS stems (
+    track_id INTEGER NOT NULL REFERENCES tracks (id) ON DELETE CASCADE,
+    stem TEXT NOT NULL,
+    path TEXT NOT NULL,
+    duration REAL,
+    size INTEGER,
+    mtime INTEGER,
+    PRIMARY KEY (track_id, stem)
+);
+"""
+
+FINGERPRINT_BLOCK = 1 << 20
+
+
+def content_fingerprint(path):
+    # Size plus the first and last MiB: cheap on long files and stable across renames/copies
+    size = os.path.getsize(path)
+    h = hashlib.sha1(str(size).encode())
+    with open(path, 'rb') as f:
+        h.update(f.read(FINGERPRINT_BLOCK))
+        if size > 2 * FINGERPRINT_BLOCK:
+            f.seek(-FINGERPRINT_BLOCK, os.SEEK_END)
+            h.update(f.read(FINGERPRINT_BLOCK))
+    return h.hexdigest()
+
+
+def _stem_row(stem, path):
+    st = os.stat(path)
+    try:
+        duration = sf.info(path).duration
+    except Exception:
+        duration = None
+    return stem, os.path.abspath(path), duration, st.st_size, st.st_mtime_ns
+
+
+class StemLibrary:
+    def __init__(self, db_file):
+        self.db_file = db_file
+        self.lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        # One short-lived connection per call keeps this safe to use from worker threads
+        conn = sqlite3.connect(self.db_file, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    def add(self, name, stems, source=None, fingerprint=None, model=None, stem_mode=None, duration=None, sample_rate=None):
+        folder = os.path.abspath(os.path.dirname(next(iter(stems.values()))))
+        rows = [_stem_row(stem, path) for stem, path in stems.items()]
+        if duration is None:
+            duration = max((r[2] for r in rows if r[2]), default=None)
+        with self.lock, self._connect() as conn:
+            conn.execute("DELETE FROM tracks WHERE folder = ?", (folder,))
+            cur = conn.execute(
+                "INSERT INTO tracks (name, source, fingerprint, model, stem_mode, duration, sample_rate, folder, added) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (name, source, fingerprint, model, stem_mode, duration, sample_rate, folder, time.time())
+            )
+            track_id = cur.lastrowid
+            conn.executemany(
+                "INSERT INTO stems (track_id, stem, path, duration, size, mtime) VALUES (?, ?, ?, ?, ?, ?)",
+                [(track_id,) + row for row in rows]
+            )
+        return track_id
+
+    def refresh_stems(self, folder):
+        folder = os.path.abspath(folder)
+        with self.lock, self._connect() as conn:
+            rows = conn.execute(
+                "SELECT stems.track_id, stems.stem, stems.path FROM stems JOIN tracks ON tracks.id = stems.track_id WHERE tracks.folder = ?",
+                (folder,)
+            ).fetchall()
+            for r in rows:
+                if os.path.exists(r['path']):
+                    _, _, duration, size, mtime = _stem_row(r['stem'], r['path'])
+                    conn.execute(
+                        "UPDATE stems SET duration = ?, size = ?, mtime = ? WHERE track_id = ? AND stem = ?",
+                        (duration, size, mtime, r['track_id'], r['stem'])
+                    )
+
+    def remove(self, track_id):
+        with self.lock, self._connect() as conn:
+            conn.execute("DELETE FROM tracks WHERE id = ?", (track_id,))
+
+    def count(self, query=""):
+        where, params = self._where(query)
+        with self._connect() as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM tracks {where}", params).fetchone()[0]
+
+    def search(self, query="", limit=100, offset=0):
+        where, params = self._where(query)
+        with self._connect() as conn:
+            return [dict(r) for r in conn.execute(
+                "SELECT id, name, source, model, stem_mode, duration, folder, added FROM tracks "
+                f"{where} ORDER BY added DESC LIMIT ? OFFSET ?",
+                params + [limit, offset]
+            )]
+
+    def _where(self, query):
+        terms = query.split()
+        if not terms:
+            return "", []
+        clauses = []
+        params = []
+        for term in terms:
+            pattern = "%" + term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+            clauses.append("(name LIKE ? ESCAPE '\\' OR source LIKE ? ESCAPE '\\' OR stem_mode LIKE ? ESCAPE '\\')")
+            params += [pattern, pattern, pattern]
+        return "WHERE " + " AND ".join(clauses), params
+
+    def find_by_fingerprint(self, fingerprint, stem_mode=None):
+        sql = "SELECT id, name, folder, stem_mode FROM tracks WHERE fingerprint = ?"
+        params = [fingerprint]
+        if stem_mode is not None:
+            sql += " AND stem_mode = ?"
+            params.append(stem_mode)
+        with self._connect() as conn:
+            return [dict(r) for r in conn.execute(sql + " ORDER BY added DESC", params)]
+
+    def stems(self, track_id):
+        with self._connect() as conn:
+            rows = conn.execute("SELECT stem, path, size, mtime FROM stems WHERE track_id = ? ORDER BY rowid", (track_id,)).fetchall()
+        stems = {}
+        missing = []
+        for r in rows:
+            if not os.path.exists(r['path']):
+                missing.append(r['path'])
+            stems[r['stem']] = r['path']
+        return stems, missing
+
+    def import_folder(self, root, progress=None):
+        # One-off import of results separated before the index existed
+        with self._connect() as conn:
+            known = {r[0] for r in conn.execute("SELECT folder FROM tracks")}
+        tracks = discover_tracks(root)
+        added = 0
+        for i, (folder, stems) in enumerate(tracks, 1):
+            if os.path.abspath(folder) not in known:
+                name = os.path.basename(os.path.dirname(folder))
+                stem_mode = os.path.basename(folder)[len("separated "):-len(" stems")]
+                self.add(name, stems, stem_mode=stem_mode)
+                added += 1
+            if progress:
+                progress(i, len(tracks))
+        return added
@@ -0,0 +1,131 @@
+import numpy as np
+from scipy.ndimage import median_filter
+from scipy.signal import stft, istft
+
+# Same names and order as the demucs 4-stem models, so mixer presets and the player work unchanged
+SOURCES = ['drums', 'bass', 'other', 'vocals']
+
+N_FFT = 2048
+HOP = 512
+
+
+def soft_mask(target, other, power=2.0, eps=1e-10):
+    target = target ** power
+    return target / (target + other ** power + eps)
+
+
+def pool(mag, axis, factor=2):
+    n = mag.shape[axis] // factor * factor
+    head = np.take(mag, np.arange(n), axis=axis)
+    shape = list(mag.shape)
+    shape[axis] = n // factor
+    shape.insert(axis + 1, factor)
+    pooled = head.reshape(shape).mean(axis=axis + 1)
+    if n < mag.shape[axis]:
+        pooled = np.concatenate([pooled, np.take(mag, [n], axis=axis)], axis=axis)
+    return pooled
+
+
+def unpool(pooled, axis, size, factor=2):
+    return np.repeat(pooled, factor, axis=axis).take(np.arange(size), axis=axis)
+
+
+def hpss_masks(mag, kernel=17):
+    # Harmonic sounds are steady across time, percussive ones are spread across frequency.
+    # Each median runs along its own axis on a grid halved along that axis: a quarter of the work
+    # of the full-resolution filters, and the masks are smooth enough not to notice
+    half = kernel // 2 | 1
+    harmonic = median_filter(pool(mag, 1), size=(1, half), mode='nearest')
+    percussive = median_filter(pool(mag, 0), size=(half, 1), mode='nearest')
+    return soft_mask(unpool(harmonic, 1, mag.shape[1]), unpool(percussive, 0, mag.shape[0]))
+
+
+def repeating_period(power, min_frames, max_frames, bands=64):
+    # Beat spectrum: autocorrelation of each frequency row over time, averaged over frequency.
+    # Rows are summed into a few bands first; the period only needs the rhythm, not the pitch
+    n = power.shape[1]
+    edges = np.linspace(0, power.shape[0], bands + 1).astype(int)
+    power = np.add.reduceat(power, edges[:-1], axis=0)
+    spectrum = np.fft.rfft(power, n=2 * n, axis=1)
+    acf = np.fft.irfft(np.abs(spectrum) ** 2, axis=1)[:, :n]
+    beat = acf.mean(axis=0) / (acf.mean(axis=0)[0] + 1e-10)
+    beat /= np.arange(n, 0, -1) / n
+    max_frames = min(max_frames, n // 3)
+    if max_frames <= min_frames:
+        return None
+    return min_frames + int(np.argmax(beat[min_frames:max_frames]))
+
+
+def repeating_mask(mag, period):
+    # REPET: whatever repeats every `period` frames is accompaniment; the median over repetitions models it
+    bins, n = mag.shape
+    count = -(-n // period)
+    padded = np.full((bins, count * period), np.nan, dtype=mag.dtype)
+    padded[:, :n] = mag
+    model = np.nanmedian(padded.reshape(bins, count, period), axis=1)
+    model = np.tile(model, (1, count))[:, :n]
+    return np.minimum(model, mag) / (mag + 1e-10)
+
+
+def centre_mask(left, right, sharpness=4.0):
+    # 1 where both channels carry the same signal (vocals are almost always mixed to the centre)
+    similarity = 2 * np.abs(left * np.conj(right)) / (np.abs(left) ** 2 + np.abs(right) ** 2 + 1e-10)
+    return similarity ** sharpness
+
+
+def band(freqs, low, high, width=0.5):
+    # Smooth band-pass weight over an octave-ish transition so the mask has no hard edge
+    rise = np.clip(np.log2(np.maximum(freqs, 1.0) / low) / width + 0.5, 0.0, 1.0)
+    fall = np.clip(np.log2(high / np.maximum(freqs, 1.0)) / width + 0.5, 0.0, 1.0)
+    return (rise * fall)[:, None]
+
+
+def separate(y, sample_rate, bass_cutoff=160.0, vocal_band=(150.0, 8000.0), period_range=(1.0, 12.0)):
+    y = np.asarray(y, dtype=np.float32)
+    if y.ndim == 1:
+        y = np.stack([y, y])
+    length = y.shape[-1]
+    freqs, _, spec = stft(y, fs=sample_rate, nperseg=N_FFT, noverlap=N_FFT - HOP)
+    spec = spec.astype(np.complex64)
+    mag = np.abs(spec).mean(axis=0)
+
+    percussive = 1.0 - hpss_masks(mag)
+    harmonic = 1.0 - percussive
+
+    frames_per_second = sample_rate / HOP
+    period = repeating_period(
+        (mag * harmonic) ** 2,
+        int(period_range[0] * frames_per_second),
+        int(period_range[1] * frames_per_second)
+    )
+    non_repeating = 1.0 - repeating_mask(mag * harmonic, period) if period else np.ones_like(mag)
+    vocal = non_repeating * band(freqs, *vocal_band)
+    if y.shape[0] >= 2:
+        vocal *= centre_mask(spec[0], spec[1])
+
+    masks = {
+        'drums': percussive,
+        'vocals': harmonic * vocal,
+        'bass': harmonic * (1.0 - vocal) * band(freqs, 1.0, bass_cutoff),
+    }
+
+    sources = np.zeros((len(SOURCES), y.shape[0], length), dtype=np.float32)
+    for i, name in enumerate(SOURCES):
+        if name == 'other':
+            continue
+        _, out = istft(spec * masks[name].astype(np.float32), fs=sample_rate, nperseg=N_FFT, noverlap=N_FFT - HOP)
+        n = min(length, out.shape[-1])
+        sources[i, :, :n] = out[:, :n]
+    # The STFT reconstructs exactly, so the last stem is simply what the others leave of the mix
+    sources[SOURCES.index('other')] = y - sources.sum(axis=0)
+    return sources
+
+
+class LiteSeparator:
+    sources = SOURCES
+
+    def __init__(self, **options):
+        self.options = options
+
+    def separate(self, y, sample_rate):
+        return separate(y, sample_rate, **self.options)
@@ -1,7 +1,10 @@
+import time
+STARTUP_BEGIN = time.perf_counter()
+
 import sys
 import os
-import subprocess
 import json
+import subprocess
 from tkinter import filedialog, messagebox
 
 from io import StringIO
@@ -15,33 +18,25 @@ if sys.stdout is None:
 if sys.stderr is None:
     sys.stderr = NullWriter()
 
-def resource_path(relative_path):
-    try:
-        base_path = sys._MEIPASS
-    except Exception:
-        base_path = os.path.abspath(".")
-    return os.path.join(base_path, relative_path)
-
 import customtkinter as ctk
 import threading
-import re
-from pathlib import Path
 import pygame
-import time
 import queue
 import numpy as np
-import librosa
-import soundfile as sf
 from pydub import AudioSegment
-from pydub.effects import normalize, high_pass_filter, compress_dynamic_range
 import tempfile
-import torch
-import torchaudio
-from demucs import pretrained
-from demucs.apply import apply_model
+import audio_probe
+from audio_io import parse_time
+from practice import StemSTFTCache, PracticeRenderer
+from mix_renderer import DEFAULT_MIX_PRESETS, discover_tracks, render_batch, render_mix
+from ingest import FolderWatcher
+from engine import StemEngine, format_time
 
 class MusicStemTool(ctk.CTk):
-    def __init__(self):
+    url_placeholder = "Paste YouTube/SoundCloud URLs or local file/folder paths here (one per line for batch)"
+    
+    def __init__(self, measure_startup=False):
+        imports_done = time.perf_counter() - STARTUP_BEGIN
         super().__init__()
         
         self.title("Music Stem Separator (Demucs)")
@@ -50,8 +45,14 @@ class MusicStemTool(ctk.CTk):
         ctk.set_appearance_mode("dark")
         ctk.set_default_color_theme("blue")
         
-        self.config_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), "config.json")
-        self.output_dir = self.load_config().get("output_dir", os.path.join(os.path.expanduser("~"), "MusicStems"))
+        self.update_queue = queue.Queue()
+        self.engine = StemEngine(
+            on_info=self.update_info,
+            on_progress=self.update_progress,
+            on_reset=self.reset_progress,
+            on_library_changed=lambda: self.update_queue.put({'type': 'library_changed'})
+        )
+        self.library_window = None
         self.is_processing = False
         self.current_theme = "dark"
         self.current_stems = {}
@@ -59,12 +60,23 @@ class MusicStemTool(ctk.CTk):
         self.paused = False
         self.audio_length = 0
         self.current_position = 0
+        self.play_offset = 0.0
+        self.rendered_length = 0.0
+        self.stems_available = None
+        self._play_generation = 0
+        self.practice_cache = None
+        self.practice_renderer = None
+        self.practice_channel = None
+        self.practice_active = False
+        self._practice_lock = threading.Lock()
         self.sr = None
         self.stem_audio = {}
         self.play_mode = None  
         self.local_file = None
-        
-        self.update_queue = queue.Queue()
+        self.watcher = None
+        self.watch_pending = []
+        self.measure_startup = measure_startup
+        self.startup_times = {'imports': imports_done}
         
         pygame.mixer.init()
         pygame.mixer.set_num_channels(32)
@@ -73,27 +85,28 @@ class MusicStemTool(ctk.CTk):
         
         self.setup_ui()
         self.process_updates()
+        self.after_idle(self.on_window_shown)
         
+    def on_window_shown(self):
+        self.startup_times['window'] = time.perf_counter() - STARTUP_BEGIN
+        threading.Thread(target=self.warm_up, daemon=True).start()
+    
+    def warm_up(self):
+        # Heavy imports happen here, after the window is up; a job started meanwhile just waits on the import lock
+        try:
+            self.engine.warm_up()
+        except Exception as e:
+            self.update_info(f"Warning: warm-up failed: {e}")
+        self.update_queue.put({'type': 'warmed_up', 'seconds': time.perf_counter() - STARTUP_BEGIN})
+    
     def format_time(self, s):
-        m, sec = divmod(int(s), 60)
-        return f"{m}:{sec:02d}"
+        return format_time(s)
         
     def load_config(self):
-        if os.path.exists(self.config_file):
-            try:
-                with open(self.config_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except:
-                pass
-        return {}
+        return self.engine.load_config()
     
-    def save_config(self):
-        config = {"output_dir": self.output_dir}
-        try:
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(config, f, indent=4)
-        except:
-            pass
+    def save_config(self, **updates):
+        self.engine.save_config(output_dir=self.engine.output_dir, **updates)
         
     def process_updates(self):
         updated = False
@@ -125,6 +138,21 @@ class MusicStemTool(ctk.CTk):
                         self.player_seek_slider.set(pos / total)
                     except:
                         pass
+                elif msg_type == 'watch_files':
+                    self.watch_pending.extend(msg['files'])
+                    self.drain_watch_queue()
+                elif msg_type == 'stop_playback':
+                    self.stop_playback()
+                elif msg_type == 'watch_drain':
+                    self.drain_watch_queue()
+                elif msg_type == 'library_changed':
+                    self.refresh_library()
+                elif msg_type == 'warmed_up':
+                    self.startup_times['ready'] = msg['seconds']
+                    if self.measure_startup:
+                        print(json.dumps({k: round(v, 3) for k, v in self.startup_times.items()}))
+                        self.destroy()
+                        return
             except queue.Empty:
                 break
         if updated:
@@ -179,7 +207,35 @@ class MusicStemTool(ctk.CTk):
             corner_radius=10
         )
         self.url_entry.pack(fill="x", padx=15, pady=(5, 10))
-        self.url_entry.insert("1.0", "Paste YouTube/SoundCloud URLs here (one per line for batch)")
+        self.url_entry.insert("1.0", self.url_placeholder)
+        
+        source_btn_container = ctk.CTkFrame(url_section, fg_color="transparent")
+        source_btn_container.pack(fill="x", padx=15, pady=(0, 10))
+        
+        ctk.CTkButton(
+            source_btn_container,
+            text="📄 Add Files",
+            width=120,
+            height=32,
+            command=self.add_local_files
+        ).pack(side="left", padx=(0, 8))
+        
+        ctk.CTkButton(
+            source_btn_container,
+            text="📂 Add Folder",
+            width=120,
+            height=32,
+            command=self.add_local_folder
+        ).pack(side="left", padx=(0, 8))
+        
+        self.watch_btn = ctk.CTkButton(
+            source_btn_container,
+            text="👁 Watch Folder",
+            width=140,
+            height=32,
+            command=self.toggle_watch_folder
+        )
+        self.watch_btn.pack(side="left")
         
         quality_section = self.create_section(content, "🎚️ Audio Quality")
         
@@ -227,7 +283,8 @@ class MusicStemTool(ctk.CTk):
         
         stem_options = [
             ("2 Stems", "2", "🎤 Vocals + Instrumental"),
-            ("4 Stems", "4", "🎼 Vocals, Drums, Bass, Other")
+            ("4 Stems", "4", "🎼 Vocals, Drums, Bass, Other"),
+            ("Lite", "lite", "⚡ Instant rough split for previews (no AI model)")
         ]
         
         for label, value, desc in stem_options:
@@ -239,6 +296,70 @@ class MusicStemTool(ctk.CTk):
                 font=ctk.CTkFont(size=13)
             ).pack(anchor="w", pady=3)
         
+        range_container = ctk.CTkFrame(self.stem_section, fg_color="transparent")
+        range_container.pack(fill="x", padx=15, pady=(0, 15))
+        
+        ctk.CTkLabel(
+            range_container,
+            text="⏱ Range (optional):",
+            font=ctk.CTkFont(size=13)
+        ).pack(side="left", padx=(0, 10))
+        
+        self.range_start_entry = ctk.CTkEntry(
+            range_container,
+            placeholder_text="Start m:ss",
+            width=100
+        )
+        self.range_start_entry.pack(side="left", padx=(0, 5))
+        
+        ctk.CTkLabel(range_container, text="to", font=ctk.CTkFont(size=13)).pack(side="left", padx=5)
+        
+        self.range_end_entry = ctk.CTkEntry(
+            range_container,
+            placeholder_text="End m:ss",
+            width=100
+        )
+        self.range_end_entry.pack(side="left", padx=(5, 0))
+        
+        deadline_container = ctk.CTkFrame(self.stem_section, fg_color="transparent")
+        deadline_container.pack(fill="x", padx=15, pady=(0, 15))
+        
+        ctk.CTkLabel(
+            deadline_container,
+            text="⌛ Deadline per track (optional):",
+            font=ctk.CTkFont(size=13)
+        ).pack(side="left", padx=(0, 10))
+        
+        self.deadline_entry = ctk.CTkEntry(
+            deadline_container,
+            placeholder_text="m:ss",
+            width=100
+        )
+        self.deadline_entry.pack(side="left")
+        
+        ctk.CTkLabel(
+            deadline_container,
+            text="lowers quality only as far as needed",
+            font=ctk.CTkFont(size=11),
+            text_color="gray50"
+        ).pack(side="left", padx=(10, 0))
+        
+        self.progressive_var = ctk.BooleanVar(value=self.load_config().get("progressive_playback", True))
+        ctk.CTkCheckBox(
+            stems_container,
+            text="▶ Start playback while separating",
+            variable=self.progressive_var,
+            font=ctk.CTkFont(size=13)
+        ).pack(anchor="w", pady=(8, 3))
+        
+        self.post_process_var = ctk.BooleanVar(value=self.load_config().get("post_process", True))
+        ctk.CTkCheckBox(
+            stems_container,
+            text="✨ Post-process stems (high-pass, compression, normalize)",
+            variable=self.post_process_var,
+            font=ctk.CTkFont(size=13)
+        ).pack(anchor="w", pady=(3, 3))
+        
         dir_section = self.create_section(content, "📁 Output Location")
         
         dir_container = ctk.CTkFrame(dir_section, fg_color="transparent")
@@ -246,7 +367,7 @@ class MusicStemTool(ctk.CTk):
         
         self.dir_label = ctk.CTkLabel(
             dir_container,
-            text=self.output_dir,
+            text=self.engine.output_dir,
             font=ctk.CTkFont(size=12),
             anchor="w",
             fg_color=("gray80", "gray25"),
@@ -263,6 +384,22 @@ class MusicStemTool(ctk.CTk):
             command=self.select_directory
         ).pack(side="right")
         
+        ctk.CTkButton(
+            dir_container,
+            text="🎛 Batch Mixes",
+            width=130,
+            height=35,
+            command=self.start_batch_mixes
+        ).pack(side="right", padx=(0, 10))
+        
+        ctk.CTkButton(
+            dir_container,
+            text="📚 Library",
+            width=110,
+            height=35,
+            command=self.open_library
+        ).pack(side="right", padx=(0, 10))
+        
         progress_section = self.create_section(content, "📊 Download Progress")
         
         self.progress_bar = ctk.CTkProgressBar(
@@ -340,17 +477,74 @@ class MusicStemTool(ctk.CTk):
             self.current_theme = "dark"
         
     def select_directory(self):
-        directory = filedialog.askdirectory(initialdir=self.output_dir, title="Select output directory")
+        directory = filedialog.askdirectory(initialdir=self.engine.output_dir, title="Select output directory")
         if directory:
-            self.output_dir = directory
+            self.engine.set_output_dir(directory)
             self.dir_label.configure(text=directory)
             self.save_config()
     
-    def sanitize_filename(self, filename):
-        filename = re.sub(r'[<>:"/\\|?*]', '', filename)
-        filename = filename.strip()
-        return filename
-            
+    def append_sources(self, paths):
+        current = self.url_entry.get("1.0", "end").strip()
+        if current == self.url_placeholder:
+            self.url_entry.delete("1.0", "end")
+            current = ""
+        text = "\n".join(paths)
+        self.url_entry.insert("end", ("\n" if current else "") + text)
+    
+    def add_local_files(self):
+        filetypes = [
+            ("Audio files", "*.mp3 *.wav *.flac *.ogg *.m4a *.opus *.aiff"),
+            ("All files", "*.*")
+        ]
+        paths = filedialog.askopenfilenames(title="Select audio files to separate", filetypes=filetypes)
+        if paths:
+            self.append_sources(list(paths))
+    
+    def add_local_folder(self):
+        folder = filedialog.askdirectory(title="Select folder with audio files")
+        if folder:
+            self.append_sources([folder])
+    
+    def toggle_watch_folder(self):
+        if self.watcher is not None:
+            self.watcher.stop()
+            self.watcher = None
+            self.watch_btn.configure(text="👁 Watch Folder")
+            self.update_info("Stopped watching folder")
+            return
+        folder = filedialog.askdirectory(title="Select folder to watch for new audio")
+        if not folder:
+            return
+        self.watcher = FolderWatcher(
+            folder,
+            self.on_watch_files,
+            state=self.engine.ingest_state,
+            stem_mode_getter=self.watch_stem_mode
+        )
+        self.watcher.start()
+        self.watch_btn.configure(text="⏹ Stop Watching")
+        self.update_info(f"👁 Watching {folder} for new audio files...")
+    
+    def watch_stem_mode(self):
+        # Runs on the watcher thread, possibly mid-batch: read the widgets but leave the engine's job settings alone
+        try:
+            time_range = self.get_time_range()
+        except Exception:
+            time_range = None
+        return self.engine.ingest_mode(time_range, self.stem_mode_var.get())
+    
+    def on_watch_files(self, files):
+        self.update_queue.put({'type': 'watch_files', 'files': files})
+    
+    def drain_watch_queue(self):
+        if self.is_processing or not self.watch_pending:
+            return
+        files = list(dict.fromkeys(self.watch_pending))
+        self.watch_pending = []
+        self.is_processing = True
+        thread = threading.Thread(target=self.process, kwargs={'local_files': files, 'notify': False}, daemon=True)
+        thread.start()
+    
     def update_progress(self, percent, speed="", eta=""):
         info_text = f"Progress: {percent:.1f}%"
         if speed:
@@ -371,113 +565,104 @@ class MusicStemTool(ctk.CTk):
     def reset_progress(self):
         self.update_queue.put({'type': 'reset_progress'})
         
-    def check_dependencies(self):
-        # Full path to bundled ffmpeg.exe
-        ffmpeg_path = resource_path("ffmpeg/bin/ffmpeg.exe")
-        
+    def get_time_range(self):
         try:
-            subprocess.run([ffmpeg_path, "-version"], 
-                         capture_output=True, check=True)
-        except:
-            return False, "FFmpeg not found. (Bundled version missing?) Install from https://ffmpeg.org"
-        
-        # Full path to bundled yt-dlp.exe
-        ytdlp_path = resource_path("yt-dlp.exe")
-        
-        try:
-            subprocess.run([ytdlp_path, "--version"], 
-                         capture_output=True, check=True)
-        except:
-            return False, "yt-dlp not found. Install with: pip install yt-dlp"
-        
+            start = parse_time(self.range_start_entry.get())
+            end = parse_time(self.range_end_entry.get())
+        except ValueError:
+            raise Exception("⚠️ Range must be given as seconds or m:ss")
+        if start is None and end is None:
+            return None
+        start = start or 0.0
+        if end is not None and end <= start:
+            raise Exception("⚠️ Range end must be after range start")
+        return start, end
+    
+    def get_deadline(self):
         try:
-            import demucs
-            pretrained.get_model('htdemucs')
-        except Exception as e:
-            return False, f"Demucs not available: {str(e)}. Install: pip install demucs[torch]"
+            deadline = parse_time(self.deadline_entry.get())
+        except ValueError:
+            raise Exception("⚠️ Deadline must be given as seconds or m:ss")
+        return deadline or None
+    
+    def sync_engine_settings(self):
+        self.engine.stem_mode = self.stem_mode_var.get()
+        self.engine.quality = self.quality_var.get()
+        self.engine.mode = self.mode_var.get()
+        self.engine.time_range = self.get_time_range()
+        self.engine.progressive = self.progressive_var.get()
+        self.engine.post_process = self.post_process_var.get()
+        self.engine.deadline = self.get_deadline()
+    
+    def reprocess_current_stems(self):
+        if not self.current_stems or self.is_processing:
+            return
+        if self.stems_available is not None:
+            messagebox.showinfo("Re-process", "Stems are still being separated. Try again when separation has finished.")
+            return
+        stems = dict(self.current_stems)
+        folder = os.path.dirname(next(iter(stems.values())))
+        self.stop_stems()
         
-        return True, "OK"
+        def worker():
+            try:
+                self.update_info("Applying post-processing chain...")
+                self.engine.post_process = self.post_process_var.get()
+                ran = self.engine.post_process_stems(folder)
+                self.engine.library.refresh_stems(folder)
+                self.load_stems(stems, rebuild_ui=False)
+                self.update_info(f"✅ Post-processing applied ({ran} stem(s) processed, {len(stems) - ran} from cache)")
+            except Exception as e:
+                self.update_info("❌ Error")
+                messagebox.showerror("Error", f"Post-processing failed: {str(e)}")
         
-    def separate_stems(self, audio_file):
-        try:
-            self.update_info("Starting stem separation with Demucs... (This may take a while)")
-            
-            stem_count = self.stem_mode_var.get()
-            song_name = Path(audio_file).stem
-            song_name = self.sanitize_filename(song_name)
-            output_path = os.path.join(self.output_dir, song_name)
-            os.makedirs(output_path, exist_ok=True)
-            
-            y, sample_rate = librosa.load(audio_file, sr=None, mono=False)
-            if len(y.shape) == 1:
-                y = np.stack([y, y])
-            if sample_rate != 44100:
-                y = librosa.resample(y, orig_sr=sample_rate, target_sr=44100)
-                sample_rate = 44100
-            waveform = torch.from_numpy(y).float()
-            
-            is_two_stems = stem_count == "2"
-            
-            if is_two_stems:
-                model = pretrained.get_model('mdx_extra')
-                stem_mapping = {'no_vocals': 'instrumental'}
-            else:
-                model = pretrained.get_model('htdemucs')
-                stem_mapping = {}
-            
-            device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
-            model.to(device)
-            model.eval()
-            waveform = waveform.to(device)
-            
-            with torch.no_grad():
-                sources = apply_model(model, waveform.unsqueeze(0), device=device, split=True, overlap=0.25, progress=True)[0]
-            
-            self.current_stems = {}
-            subfolder = os.path.join(output_path, "separated 4 stems" if not is_two_stems else "separated 2 stems")
-            os.makedirs(subfolder, exist_ok=True)
-            
-            stem_order = model.sources
-            for i, stem in enumerate(stem_order):
-                source_waveform = sources[i].cpu()
-                
-                stem_file = os.path.join(subfolder, f"{stem}.wav")
-                sf.write(stem_file, source_waveform.numpy().T, sample_rate)
-                
-                mapped_stem = stem_mapping.get(stem, stem)
-                self.current_stems[mapped_stem] = stem_file
-            
-            self.post_process_stems(subfolder, list(self.current_stems.keys()))
-            
-            self.update_info("✅ Stem separation completed!")
-            self.load_stems(self.current_stems)
-            
-        except Exception as e:
-            raise Exception(f"Stem separation error: {str(e)}")
-    
-    def post_process_stems(self, output_path, stems):
-        for stem in stems:
-            stem_file = os.path.join(output_path, f"{stem}.wav")
-            if os.path.exists(stem_file):
-                audio = AudioSegment.from_wav(stem_file)
-                audio = high_pass_filter(audio, cutoff=80)
-                audio = compress_dynamic_range(audio)
-                audio = normalize(audio)
-                audio.export(stem_file, format="wav")
+        threading.Thread(target=worker, daemon=True).start()
     
-    def load_stems(self, stems_dict):
-        self.stem_audio = {}
+    def load_stems(self, stems_dict, rebuild_ui=True):
+        stem_audio = {}
         if stems_dict:
             first_path = list(stems_dict.values())[0]
-            _, self.sr = librosa.load(first_path, sr=None)
+            sr = audio_probe.probe(first_path).sample_rate
             for stem, path in stems_dict.items():
+                import librosa
                 y, sr_check = librosa.load(path, sr=None)
-                if sr_check != self.sr:
+                if sr_check != sr:
                     raise ValueError(f"Sample rate mismatch for {stem}")
-                self.stem_audio[stem] = (y, self.sr)
+                stem_audio[stem] = (y, sr)
+            self.sr = sr
+            self.stem_audio = stem_audio
+            self.stems_available = None
             self.audio_length = len(next(iter(self.stem_audio.values()))[0]) / self.sr
             self.play_mode = "stems"
-            self.update_queue.put({'type': 'create_player'})
+            if rebuild_ui:
+                self.update_queue.put({'type': 'create_player'})
+        else:
+            self.stem_audio = stem_audio
+    
+    def show_stems(self, stems, rebuild_ui=True):
+        self.current_stems = stems
+        self.load_stems(self.current_stems, rebuild_ui=rebuild_ui)
+    
+    def begin_progressive_stems(self, planned, n_samples, sample_rate):
+        self.update_queue.put({'type': 'stop_playback'})
+        stem_audio = {stem: (np.zeros(n_samples, dtype=np.float32), sample_rate) for stem in planned}
+        self.current_stems = dict(planned)
+        self.sr = sample_rate
+        self.stem_audio = stem_audio
+        self.audio_length = n_samples / sample_rate
+        self.stems_available = 0.0
+        self.play_mode = "stems"
+        self.update_queue.put({'type': 'create_player'})
+        return lambda sources, start, end: self.publish_stem_region(stem_audio, sources, start, end)
+    
+    def publish_stem_region(self, target, sources, start, end):
+        # Another track may have been loaded into the player since this separation started
+        if self.stem_audio is not target:
+            return
+        for i, (y, _) in enumerate(target.values()):
+            y[start:end] = sources[i, :, start:end].mean(axis=0)
+        self.stems_available = end / self.sr
+        self.update_info(f"Separated {self.format_time(self.stems_available)} / {self.format_time(self.audio_length)} (playback available)")
     
     def open_local_audio(self):
         filetypes = [
@@ -491,8 +676,7 @@ class MusicStemTool(ctk.CTk):
             self.local_file = file_path
             self.play_mode = "local"
             try:
-                audio = AudioSegment.from_file(file_path)
-                self.audio_length = len(audio) / 1000.0
+                self.audio_length = audio_probe.probe(file_path).duration
             except Exception as e:
                 messagebox.showerror("Error", f"Could not load audio file: {str(e)}")
                 return
@@ -609,19 +793,36 @@ class MusicStemTool(ctk.CTk):
             self.play_btn.configure(state="disabled")
             self.pause_btn.configure(state="normal", text="⏸ Pause")
             self.stop_btn.configure(state="normal")
-            threading.Thread(target=self.update_local_position, daemon=True).start()
+            self.play_offset = 0.0
+            self.start_position_updates()
         except Exception as e:
             messagebox.showerror("Error", f"Could not play audio: {str(e)}")
     
-    def update_local_position(self):
-        while self.playing:
+    def start_position_updates(self):
+        self._play_generation += 1
+        threading.Thread(target=self.update_local_position, args=(self._play_generation,), daemon=True).start()
+    
+    def update_local_position(self, generation=None):
+        while self.playing and generation == self._play_generation:
             pos_ms = pygame.mixer.music.get_pos()
-            pos = pos_ms / 1000.0 if pos_ms >= 0 else self.current_position
+            pos = self.play_offset + pos_ms / 1000.0 if pos_ms >= 0 else self.current_position
+            if not self.paused:
+                self.current_position = pos
+            self.update_queue.put({'type': 'player_progress', 'position': pos})
             if self.play_mode == "local":
-                self.update_queue.put({'type': 'player_progress', 'position': pos})
                 if not self.paused and pos >= self.audio_length - 0.1:
                     self.stop_local()
                     break
+            elif self.play_mode == "stems" and not self.paused:
+                if self.rendered_length < self.audio_length - 0.1 and pos >= self.rendered_length - 1.0:
+                    # Progressive mode: extend playback once more of the track has been separated
+                    available = self.stems_available if self.stems_available is not None else self.audio_length
+                    if available > self.rendered_length + 1.0:
+                        self._render_and_play_from(min(pos, self.rendered_length))
+                        break
+                elif pos >= self.audio_length - 0.1:
+                    self.stop_stems()
+                    break
             time.sleep(0.2)
     
     def update_local_volume(self, value):
@@ -745,6 +946,24 @@ class MusicStemTool(ctk.CTk):
         )
         self.stop_btn.pack(side="left", padx=5)
         
+        ctk.CTkButton(
+            btn_frame,
+            text="💾 Export Mix",
+            width=130,
+            height=40,
+            font=ctk.CTkFont(size=14, weight="bold"),
+            command=self.export_current_mix
+        ).pack(side="left", padx=5)
+        
+        ctk.CTkButton(
+            btn_frame,
+            text="🎚 Re-process",
+            width=130,
+            height=40,
+            font=ctk.CTkFont(size=14, weight="bold"),
+            command=self.reprocess_current_stems
+        ).pack(side="left", padx=5)
+        
         master_vol_frame = ctk.CTkFrame(control_frame, fg_color="transparent")
         master_vol_frame.pack(fill="x", padx=15, pady=(0, 10))
         
@@ -771,6 +990,49 @@ class MusicStemTool(ctk.CTk):
         )
         self.master_vol_label.pack(side="left")
         
+        practice_frame = ctk.CTkFrame(control_frame, fg_color="transparent")
+        practice_frame.pack(fill="x", padx=15, pady=(0, 10))
+        
+        ctk.CTkLabel(
+            practice_frame,
+            text="🎓 Tempo:",
+            font=ctk.CTkFont(size=13, weight="bold")
+        ).pack(side="left", padx=(0, 10))
+        
+        self.tempo_slider = ctk.CTkSlider(
+            practice_frame,
+            from_=50,
+            to=150,
+            number_of_steps=20,
+            width=160,
+            command=self.update_practice_controls
+        )
+        self.tempo_slider.set(100)
+        self.tempo_slider.pack(side="left")
+        
+        self.tempo_label = ctk.CTkLabel(practice_frame, text="100%", width=50, font=ctk.CTkFont(size=13, weight="bold"))
+        self.tempo_label.pack(side="left", padx=(5, 20))
+        
+        ctk.CTkLabel(
+            practice_frame,
+            text="Pitch:",
+            font=ctk.CTkFont(size=13, weight="bold")
+        ).pack(side="left", padx=(0, 10))
+        
+        self.pitch_slider = ctk.CTkSlider(
+            practice_frame,
+            from_=-6,
+            to=6,
+            number_of_steps=12,
+            width=160,
+            command=self.update_practice_controls
+        )
+        self.pitch_slider.set(0)
+        self.pitch_slider.pack(side="left")
+        
+        self.pitch_label = ctk.CTkLabel(practice_frame, text="+0 st", width=50, font=ctk.CTkFont(size=13, weight="bold"))
+        self.pitch_label.pack(side="left", padx=(5, 0))
+        
         time_frame = ctk.CTkFrame(player_frame, fg_color="transparent")
         time_frame.pack(fill="x", pady=(5, 0))
         
@@ -791,23 +1053,306 @@ class MusicStemTool(ctk.CTk):
         self.player_seek_slider.set(0)
     
     def on_stem_toggle(self):
-        if self.playing and self.play_mode == "stems":
+        # Practice playback picks up mute/volume changes on its next block
+        if self.playing and self.play_mode == "stems" and not self.practice_active:
             self._render_and_play_from(self.current_position)
     
     def update_stem_volume(self, stem, value):
-        if self.playing and self.play_mode == "stems":
+        if self.playing and self.play_mode == "stems" and not self.practice_active:
             threading.Thread(target=lambda: self._render_and_play_from(self.current_position), daemon=True).start()
     
     def update_master_volume(self, value):
         vol = float(value)
         self.master_vol_label.configure(text=f"{int(vol)}%")
         pygame.mixer.music.set_volume(vol / 100.0)
+        if self.practice_channel is not None:
+            self.practice_channel.set_volume(vol / 100.0)
+    
+    def practice_settings(self):
+        tempo = self.tempo_slider.get() / 100.0 if hasattr(self, 'tempo_slider') else 1.0
+        semitones = round(self.pitch_slider.get()) if hasattr(self, 'pitch_slider') else 0
+        return tempo, semitones
+    
+    def practice_requested(self):
+        tempo, semitones = self.practice_settings()
+        return abs(tempo - 1.0) > 1e-3 or semitones != 0
+    
+    def update_practice_controls(self, value=None):
+        tempo, semitones = self.practice_settings()
+        self.tempo_label.configure(text=f"{int(round(tempo * 100))}%")
+        self.pitch_label.configure(text=f"{semitones:+d} st")
+        if not self.practice_requested():
+            return
+        if self.playing and self.play_mode == "stems" and not self.practice_active:
+            threading.Thread(target=lambda: self.start_practice_playback(self.current_position), daemon=True).start()
+        elif self.play_mode == "stems" and self.stems_available is None and self.stem_audio and not self._practice_lock.locked():
+            # The STFT cache is only built once tempo or pitch is actually used; start it while the user is still choosing
+            if self.practice_cache is None or not self.practice_cache.is_current(self.current_stems, self.stem_audio):
+                threading.Thread(target=self.prepare_practice_cache, daemon=True).start()
+    
+    def prepare_practice_cache(self):
+        with self._practice_lock:
+            if self.practice_cache is None or not self.practice_cache.is_current(self.current_stems, self.stem_audio):
+                self.practice_cache = StemSTFTCache(self.current_stems, self.stem_audio).build()
+            return self.practice_cache
+    
+    def stem_gains(self):
+        gains = {}
+        for stem in self.stem_audio:
+            enabled = self.stem_vars[stem].get() if stem in self.stem_vars else True
+            vol = self.stem_volumes[stem].get() / 100.0 if stem in self.stem_volumes else 1.0
+            gains[stem] = vol if enabled else 0.0
+        return gains
+    
+    def start_practice_playback(self, start_seconds):
+        try:
+            if self.stems_available is not None:
+                self.update_info("Tempo/pitch is available once separation has finished")
+                return
+            if self.practice_cache is None or not self.practice_cache.is_current(self.current_stems, self.stem_audio):
+                self.update_info("Preparing tempo/pitch cache...")
+            cache = self.prepare_practice_cache()
+            pygame.mixer.music.stop()
+            self.practice_renderer = PracticeRenderer(cache, output_rate=pygame.mixer.get_init()[0])
+            self.practice_renderer.seek(start_seconds)
+            self.practice_channel = pygame.mixer.Channel(0)
+            self.practice_channel.stop()
+            vol = self.master_volume.get() / 100.0 if hasattr(self, 'master_volume') else 0.7
+            self.practice_channel.set_volume(vol)
+            self.practice_active = True
+            self.playing = True
+            self.paused = False
+            self.current_position = start_seconds
+            self.play_btn.configure(state="disabled")
+            self.pause_btn.configure(state="normal", text="⏸ Pause")
+            self.stop_btn.configure(state="normal")
+            self._play_generation += 1
+            threading.Thread(target=self.practice_loop, args=(self._play_generation,), daemon=True).start()
+        except Exception as e:
+            self.practice_active = False
+            messagebox.showerror("Error", f"Practice playback error: {str(e)}")
+    
+    def practice_loop(self, generation):
+        renderer = self.practice_renderer
+        channel = self.practice_channel
+        norm = 0.9 / max(self.practice_cache.peak, 1e-6)
+        block_starts = []
+        finished = False
+        while self.playing and generation == self._play_generation:
+            if not self.paused and channel.get_queue() is None and not finished:
+                if block_starts and channel.get_busy():
+                    block_starts.pop(0)
+                start = renderer.seconds
+                tempo, semitones = self.practice_settings()
+                block = renderer.render(self.stem_gains(), tempo, semitones)
+                if block is None:
+                    finished = True
+                elif len(block):
+                    mono = np.clip(block * norm, -1.0, 1.0)
+                    int16 = (np.column_stack((mono, mono)) * 32767).astype(np.int16)
+                    sound = pygame.sndarray.make_sound(int16)
+                    block_starts.append(start)
+                    if channel.get_busy():
+                        channel.queue(sound)
+                    else:
+                        channel.play(sound)
+            if block_starts:
+                self.current_position = block_starts[0]
+                self.update_queue.put({'type': 'player_progress', 'position': self.current_position})
+            if finished and not channel.get_busy():
+                self.stop_stems()
+                break
+            time.sleep(0.02)
+    
+    def current_mix_preset(self):
+        preset = {}
+        for stem in self.current_stems:
+            enabled = self.stem_vars[stem].get() if stem in self.stem_vars else True
+            vol = self.stem_volumes[stem].get() / 100.0 if stem in self.stem_volumes else 1.0
+            preset[stem] = 20 * np.log10(vol) if enabled and vol > 0 else None
+        return preset
+    
+    def export_current_mix(self):
+        if not self.current_stems:
+            return
+        if self.stems_available is not None:
+            messagebox.showinfo("Export Mix", "Stems are still being separated. Try again when separation has finished.")
+            return
+        out_path = filedialog.asksaveasfilename(
+            title="Export mix",
+            defaultextension=".wav",
+            filetypes=[("WAV files", "*.wav")],
+            initialdir=os.path.dirname(next(iter(self.current_stems.values())))
+        )
+        if not out_path:
+            return
+        preset = self.current_mix_preset()
+        
+        def worker():
+            try:
+                self.update_info("Rendering mix...")
+                render_mix(self.current_stems, preset, out_path)
+                self.update_info(f"💾 Mix exported: {os.path.basename(out_path)}")
+            except Exception as e:
+                self.update_info("❌ Error")
+                messagebox.showerror("Error", f"Could not export mix: {str(e)}")
+        
+        threading.Thread(target=worker, daemon=True).start()
+    
+    def open_library(self):
+        if self.library_window is not None and self.library_window.winfo_exists():
+            self.library_window.focus()
+            return
+        window = ctk.CTkToplevel(self)
+        window.title("Stem Library")
+        window.geometry("700x600")
+        self.library_window = window
+        
+        top = ctk.CTkFrame(window, fg_color="transparent")
+        top.pack(fill="x", padx=15, pady=(15, 5))
+        
+        self.library_search = ctk.CTkEntry(top, placeholder_text="Search by name, source or stem mode...", height=35)
+        self.library_search.pack(side="left", fill="x", expand=True, padx=(0, 10))
+        self.library_search.bind("<KeyRelease>", lambda e: self.schedule_library_refresh())
+        
+        ctk.CTkButton(
+            top,
+            text="📥 Import Folder",
+            width=130,
+            height=35,
+            command=self.import_library_folder
+        ).pack(side="right")
+        
+        self.library_count_label = ctk.CTkLabel(window, text="", font=ctk.CTkFont(size=12), anchor="w")
+        self.library_count_label.pack(fill="x", padx=15)
+        
+        self.library_list = ctk.CTkScrollableFrame(window)
+        self.library_list.pack(fill="both", expand=True, padx=15, pady=(5, 15))
+        
+        self._library_refresh_job = None
+        self.refresh_library()
+    
+    def schedule_library_refresh(self):
+        # Wait for a pause in typing instead of querying on every key
+        if self._library_refresh_job is not None:
+            self.after_cancel(self._library_refresh_job)
+        self._library_refresh_job = self.after(250, self.refresh_library)
+    
+    def refresh_library(self):
+        if self.library_window is None or not self.library_window.winfo_exists():
+            return
+        self._library_refresh_job = None
+        query = self.library_search.get().strip()
+        limit = self.load_config().get("library_page_size", 100)
+        rows = self.engine.library.search(query, limit=limit)
+        total = self.engine.library.count(query)
+        
+        for widget in self.library_list.winfo_children():
+            widget.destroy()
+        
+        shown = f"Showing {len(rows)} of {total}" if total > len(rows) else f"{total}"
+        self.library_count_label.configure(text=f"{shown} track(s)")
+        for row in rows:
+            details = [f"{row['stem_mode']} stems" if row['stem_mode'] else None]
+            if row['duration']:
+                details.append(self.format_time(row['duration']))
+            if row['model']:
+                details.append(row['model'])
+            ctk.CTkButton(
+                self.library_list,
+                text=f"{row['name']}   ·   " + "  ·  ".join(d for d in details if d),
+                anchor="w",
+                height=32,
+                fg_color=("gray80", "gray25"),
+                text_color=("gray10", "gray90"),
+                hover_color=("gray70", "gray35"),
+                command=lambda track_id=row['id']: self.open_library_track(track_id)
+            ).pack(fill="x", pady=2)
+    
+    def open_library_track(self, track_id):
+        stems, missing = self.engine.library.stems(track_id)
+        if missing or not stems:
+            if messagebox.askyesno("Stem Library", "Some stem files for this track no longer exist:\n" + "\n".join(missing[:5]) + "\n\nRemove it from the library?"):
+                self.engine.library.remove(track_id)
+                self.refresh_library()
+            return
+        if self.playing:
+            self.stop_stems()
+        
+        def worker():
+            try:
+                self.update_info(f"Loading {os.path.basename(os.path.dirname(os.path.dirname(next(iter(stems.values())))))}...")
+                self.current_stems = stems
+                self.load_stems(self.current_stems)
+                self.update_info("✅ Stems loaded from library")
+            except Exception as e:
+                self.update_info("❌ Error")
+                messagebox.showerror("Error", f"Could not load stems: {str(e)}")
+        
+        threading.Thread(target=worker, daemon=True).start()
+    
+    def import_library_folder(self):
+        root = filedialog.askdirectory(initialdir=self.engine.output_dir, title="Import separated tracks into the library")
+        if not root:
+            return
+        
+        def worker():
+            try:
+                added = self.engine.library.import_folder(root, progress=lambda done, total: self.update_info(f"Importing: {done}/{total} folder(s)"))
+                self.update_info(f"📚 Imported {added} track(s) into the library")
+                self.update_queue.put({'type': 'library_changed'})
+            except Exception as e:
+                self.update_info("❌ Error")
+                messagebox.showerror("Error", f"Import failed: {str(e)}")
+        
+        threading.Thread(target=worker, daemon=True).start()
+    
+    def start_batch_mixes(self):
+        if self.is_processing:
+            return
+        root = filedialog.askdirectory(initialdir=self.engine.output_dir, title="Select folder with separated tracks")
+        if not root:
+            return
+        self.is_processing = True
+        threading.Thread(target=self.render_batch_mixes, args=(root,), daemon=True).start()
+    
+    def render_batch_mixes(self, root):
+        try:
+            self.disable_btn("⏳ Rendering mixes...")
+            self.reset_progress()
+            tracks = discover_tracks(root)
+            if not tracks:
+                raise Exception("No separated tracks found in the selected folder")
+            presets = dict(DEFAULT_MIX_PRESETS)
+            presets.update(self.load_config().get("mix_presets", {}))
+            
+            def progress(done, total):
+                self.update_progress(done / total * 100)
+                self.update_info(f"Rendering mixes: {done}/{total} track(s)")
+            
+            results, elapsed = render_batch(tracks, presets, progress=progress)
+            done = sum(1 for _, status, _ in results if status == "done")
+            failed = [f"{os.path.basename(p)}: {err}" for p, status, err in results if status == "failed"]
+            self.update_info(f"🎛 Rendered {done} mix(es) for {len(tracks)} track(s) in {elapsed:.1f}s")
+            if failed:
+                messagebox.showwarning("⚠️ Completed with errors", "\n".join(failed[:10]))
+        except Exception as e:
+            self.update_info("❌ Error")
+            messagebox.showerror("❌ Error", str(e))
+        finally:
+            self.enable_btn("▶ Start Processing")
+            self.reset_progress()
+            self.is_processing = False
     
     def _render_mixed_to_tempfile(self):
         if not self.stem_audio:
             return None
         max_len = max(len(y) for y, _ in self.stem_audio.values())
         sr = self.sr
+        if self.stems_available is not None:
+            max_len = min(max_len, int(self.stems_available * sr))
+        if max_len == 0:
+            return None
         mixed = np.zeros(max_len, dtype=np.float32)
         for stem, (y, _) in self.stem_audio.items():
             enabled = self.stem_vars.get(stem, ctk.BooleanVar(value=True)).get()
@@ -836,11 +1381,15 @@ class MusicStemTool(ctk.CTk):
             channels=2
         )
         seg.export(tmp_path, format="wav")
+        self.rendered_length = max_len / sr
         return tmp_path
 
     def _render_and_play_from(self, start_seconds=0.0):
         try:
             pygame.mixer.music.stop()
+            if self.practice_channel is not None:
+                self.practice_channel.stop()
+            self.practice_active = False
             if self._temp_mixed_file and os.path.exists(self._temp_mixed_file):
                 try:
                     os.remove(self._temp_mixed_file)
@@ -866,7 +1415,8 @@ class MusicStemTool(ctk.CTk):
                 self.pause_btn.configure(state="normal", text="⏸ Pause")
                 self.stop_btn.configure(state="normal")
                 self.current_position = start_seconds
-                threading.Thread(target=self.update_local_position, daemon=True).start()
+                self.play_offset = start_seconds
+                self.start_position_updates()
             except Exception as e:
                 raise
         except Exception as e:
@@ -879,17 +1429,31 @@ class MusicStemTool(ctk.CTk):
             return
         if not self.stem_audio:
             return
+        if self.stems_available == 0:
+            self.update_info("⏳ First region is still separating, try again in a moment...")
+            return
         self.current_position = 0.0
+        if self.practice_requested():
+            threading.Thread(target=lambda: self.start_practice_playback(0.0), daemon=True).start()
+            return
         self._render_and_play_from(0.0)
     
     def seek_to_position(self, value):
         new_pos = float(value) * self.audio_length
         self.current_position = new_pos
+        if self.play_mode == "stems" and self.playing and self.practice_active:
+            self.start_practice_playback(new_pos)
+            return
         if self.play_mode == "stems" and self.playing:
+            if new_pos >= self.rendered_length - 0.5 and self.rendered_length < self.audio_length:
+                available = self.stems_available if self.stems_available is not None else self.audio_length
+                self._render_and_play_from(max(0.0, min(new_pos, available - 1.0)))
+                return
             try:
                 pygame.mixer.music.stop()
                 pygame.mixer.music.load(self._temp_mixed_file)
                 pygame.mixer.music.play(start=new_pos)
+                self.play_offset = new_pos
             except Exception:
                 pygame.mixer.music.stop()
                 pygame.mixer.music.play()
@@ -903,13 +1467,22 @@ class MusicStemTool(ctk.CTk):
                 self.play_btn.configure(state="disabled")
                 self.pause_btn.configure(state="normal", text="⏸ Pause")
                 self.stop_btn.configure(state="normal")
-                threading.Thread(target=self.update_local_position, daemon=True).start()
+                self.play_offset = new_pos
+                self.start_position_updates()
             except Exception as e:
                 print("Seek error (local):", e)
     
     def toggle_pause(self):
         if not self.playing or self.play_mode != "stems":
             return
+        if self.practice_active:
+            if self.paused:
+                self.practice_channel.unpause()
+            else:
+                self.practice_channel.pause()
+            self.paused = not self.paused
+            self.pause_btn.configure(text="▶ Resume" if self.paused else "⏸ Pause")
+            return
         if self.paused:
             pygame.mixer.music.unpause()
             self.paused = False
@@ -921,6 +1494,9 @@ class MusicStemTool(ctk.CTk):
     
     def stop_stems(self):
         pygame.mixer.music.stop()
+        if self.practice_channel is not None:
+            self.practice_channel.stop()
+        self.practice_active = False
         self.playing = False
         self.paused = False
         self.current_position = 0.0
@@ -938,125 +1514,39 @@ class MusicStemTool(ctk.CTk):
         if hasattr(self, 'stop_btn'):
             self.stop_btn.configure(state="disabled")
     
-    def download_audio(self, url, quality):
-        ytdlp_path = resource_path("yt-dlp.exe")
-        
-        song_id = re.sub(r'[^a-zA-Z0-9]', '_', url.split('/')[-1]) if '/' in url else 'audio'
-        temp_subdir = os.path.join(self.output_dir, f"temp_{song_id}")
-        os.makedirs(temp_subdir, exist_ok=True)
-        
-        cmd = [
-            ytdlp_path,  
-            "-f", f"bestaudio[abr<={quality}]/best",
-            "--audio-format", "mp3",
-            "--audio-quality", f"{quality}K",
-            "--postprocessor-args", "-ar 44100",
-            "-o", os.path.join(temp_subdir, "%(title)s.%(ext)s"),
-            "--verbose",  
-            url
-        ]
-        
-        try:
-            process = subprocess.Popen(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,  
-                universal_newlines=True,  
-                bufsize=1  
-            )
-            
-            full_output = []  
-            percent = 0
-            
-            for line in process.stdout:
-                line = line.strip()
-                full_output.append(line)
-                self.update_info(line)  
-                
-                if "%" in line:
-                    percent_match = re.search(r'(\d+(?:\.\d+)?)%', line)
-                    if percent_match:
-                        percent = float(percent_match.group(1))
-                        self.update_progress(percent)
-                elif "download" in line.lower():
-                    self.update_info(line)
-            
-            process.wait()
-            
-            if process.returncode != 0:
-                log_file = os.path.join(temp_subdir, f"temp_{song_id}_log.txt")
-                try:
-                    with open(log_file, 'w', encoding='utf-8') as f:
-                        f.write("\n".join(full_output))
-                except Exception as log_err:
-                    self.update_info(f"Warning: Could not save log: {log_err}")
-                error_msg = "\n".join(full_output[-20:])  
-                raise Exception(f"yt-dlp failed (code {process.returncode}):\n{error_msg}\nFull log saved to {log_file}")
-            
-        except Exception as e:
-            raise Exception(f"Subprocess error: {e}")
-        
-        extensions = ['.mp3', '.m4a', '.webm', '.opus', '.flac', '.wav', '.mka']
-        files = [f for f in os.listdir(temp_subdir) if any(f.lower().endswith(ext) for ext in extensions) and not f.startswith('.')]
-        
-        if not files:
-            raise Exception(f"No audio file downloaded. Check temp dir: {temp_subdir}. Available files: {os.listdir(temp_subdir)}")
-        
-        latest_file = max(files, key=lambda f: os.path.getctime(os.path.join(temp_subdir, f)))
-        downloaded_path = os.path.join(temp_subdir, latest_file)
-        
-        final_name = self.sanitize_filename(Path(latest_file).stem) + Path(latest_file).suffix
-        final_path = os.path.join(self.output_dir, final_name)
-        os.rename(downloaded_path, final_path)
-        
-        for item in os.listdir(temp_subdir):
-            os.remove(os.path.join(temp_subdir, item))
-        os.rmdir(temp_subdir)
-        
-        self.update_info(f"Downloaded: {final_name}")
-        return final_path
-    
-    def process(self):
+    def process(self, local_files=None, notify=True):
         try:
             self.disable_btn("⏳ Processing...")
             self.reset_progress()
             
-            success, message = self.check_dependencies()
-            if not success:
-                raise Exception(message)
-            
-            urls_text = self.url_entry.get("1.0", "end").strip()
-            urls = [u.strip() for u in urls_text.split('\n') if u.strip() and u.startswith('http')]
-            
-            if not urls:
-                raise Exception("⚠️ Please enter valid URL(s)")
-            
-            quality = self.quality_var.get()
-            mode = self.mode_var.get()
+            if local_files is None:
+                urls_text = self.url_entry.get("1.0", "end").strip()
+                urls, local_files = self.engine.parse_sources(urls_text.split('\n'))
+            else:
+                urls = []
             
-            total = len(urls)
-            for idx, url in enumerate(urls, 1):
-                self.update_info(f"Processing {idx}/{total}: Downloading...")
-                self.reset_progress()
-                
-                audio_file = self.download_audio(url, quality)
-                self.update_progress(100)
-                
-                if mode == "download_separate":
-                    self.update_info(f"Processing {idx}/{total}: Separating stems...")
-                    self.separate_stems(audio_file)
+            self.sync_engine_settings()
+            total, skipped, failed = self.engine.run(urls, local_files, player=self)
+            summary = self.engine.summarize(total, skipped, failed)
             
-            self.update_info("🎉 All processing completed!")
-            messagebox.showinfo("✅ Success", f"Processed {total} track(s) successfully!")
+            if notify:
+                if failed:
+                    messagebox.showwarning("⚠️ Completed with errors", summary)
+                else:
+                    messagebox.showinfo("✅ Success", summary)
             
         except Exception as e:
             self.update_info("❌ Error")
-            messagebox.showerror("❌ Error", str(e))
+            if notify:
+                messagebox.showerror("❌ Error", str(e))
+            if self.watcher is not None and local_files:
+                self.watcher.forget(local_files)
             
         finally:
             self.enable_btn("▶ Start Processing")
             self.reset_progress()
             self.is_processing = False
+            self.update_queue.put({'type': 'watch_drain'})
     
     def start_processing(self):
         if not self.is_processing:
@@ -1065,17 +1555,17 @@ class MusicStemTool(ctk.CTk):
             thread.start()
     
     def open_output_folder(self):
-        if os.path.exists(self.output_dir):
+        if os.path.exists(self.engine.output_dir):
             if sys.platform == "win32":
-                os.startfile(self.output_dir)
+                os.startfile(self.engine.output_dir)
             elif sys.platform == "darwin":
-                subprocess.run(["open", self.output_dir])
+                subprocess.run(["open", self.engine.output_dir])
             else:
-                subprocess.run(["xdg-open", self.output_dir])
+                subprocess.run(["xdg-open", self.engine.output_dir])
 
 if __name__ == "__main__":
     import multiprocessing
     multiprocessing.freeze_support()  
 
-    app = MusicStemTool()
+    app = MusicStemTool(measure_startup="--measure-startup" in sys.argv)
     app.mainloop()
\ No newline at end of file
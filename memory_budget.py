@@ -0,0 +1,260 @@
+import os
+import sys
+import threading
+import time
+from collections import namedtuple
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+MB = 1024 * 1024
+
+# Rough per-model figures; the controller's calibration factor corrects them from measured peaks
+MODEL_PROFILES = {
+    'htdemucs': {'sources': 4, 'bag': 1, 'weights_mb': 170, 'max_segment': 7.8, 'activation_mb_per_second': 200},
+    'mdx_extra': {'sources': 4, 'bag': 4, 'weights_mb': 560, 'max_segment': 44.0, 'activation_mb_per_second': 150},
+    # Lite has no segments: its spectrograms and masks cover the whole track, so they grow with its length
+    'lite': {'sources': 4, 'bag': 1, 'weights_mb': 0, 'max_segment': None, 'activation_mb_per_second': 8, 'whole_track': True},
+}
+DEFAULT_PROFILE = {'sources': 4, 'bag': 1, 'weights_mb': 300, 'max_segment': 10.0, 'activation_mb_per_second': 200}
+
+SEGMENT_CANDIDATES = (44.0, 30.0, 20.0, 10.0, 7.8, 6.0, 4.0, 3.0, 2.0)
+
+MemoryPlan = namedtuple("MemoryPlan", ["segment", "predicted_bytes", "parts", "fits", "model_name", "batch_size"], defaults=(1,))
+
+
+def model_profile(model_name):
+    return MODEL_PROFILES.get(model_name, DEFAULT_PROFILE)
+
+
+def model_segment(model):
+    # A BagOfModels has no segment of its own; every member has to fit in the window
+    members = getattr(model, 'models', None) or [model]
+    segments = [float(m.segment) for m in members if getattr(m, 'segment', None)]
+    return min(segments) if segments else None
+
+
+def estimate_job_memory(duration, model_name, segment=None, input_sample_rate=44100, input_channels=2, sample_rate=44100):
+    profile = model_profile(model_name)
+    if profile.get('whole_track'):
+        segment = duration
+    else:
+        segment = min(segment or profile['max_segment'], profile['max_segment'])
+    frames = duration * sample_rate
+    in_frames = duration * input_sample_rate
+    f32 = 4
+    # Source accumulators: apply_model keeps one output buffer, a bag of models keeps a second running total
+    accumulators = 2 if profile['bag'] > 1 else 1
+    parts = {
+        'input': in_frames * max(input_channels, 2) * f32,
+        'resampled': frames * 2 * f32 if input_sample_rate != sample_rate else 0,
+        'tensor': frames * 2 * f32,
+        'sources': frames * 2 * f32 * profile['sources'] * accumulators,
+        'activations': segment * profile['activation_mb_per_second'] * MB,
+    }
+    return int(sum(parts.values())), parts
+
+
+def total_system_memory():
+    if psutil is not None:
+        return psutil.virtual_memory().total
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def default_budget_bytes():
+    total = total_system_memory()
+    return int(total * 0.6) if total else 4096 * MB
+
+
+def current_rss():
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    if sys.platform.startswith("linux"):
+        try:
+            with open("/proc/self/statm") as f:
+                return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except Exception:
+            return None
+    return None
+
+
+class PeakMemoryMonitor:
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.baseline = None
+        self.peak = None
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        rss = current_rss()
+        if rss is not None and (self.peak is None or rss > self.peak):
+            self.peak = rss
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            self._sample()
+
+    def __enter__(self):
+        self.baseline = current_rss()
+        self.peak = self.baseline
+        if self.baseline is not None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._sample()
+        return False
+
+    @property
+    def peak_delta(self):
+        if self.baseline is None or self.peak is None:
+            return None
+        return max(0, self.peak - self.baseline)
+
+
+class AdmissionController:
+    def __init__(self, budget_bytes=None, calibration=1.0):
+        self.budget = budget_bytes or default_budget_bytes()
+        # Measured/predicted peak per model; models differ too much to share one factor.
+        # A single number (older configs) seeds every model.
+        if isinstance(calibration, dict):
+            self.default_calibration = 1.0
+            self.calibrations = dict(calibration)
+        else:
+            self.default_calibration = calibration
+            self.calibrations = {}
+        self.cond = threading.Condition()
+        self.in_use = 0
+        self.running = 0
+        self.admissions = 0
+        self.resident_models = {}
+
+    def reserve_model(self, model_name):
+        with self.cond:
+            if model_name not in self.resident_models:
+                self.resident_models[model_name] = model_profile(model_name)['weights_mb'] * MB
+
+    def calibration(self, model_name):
+        return self.calibrations.get(model_name, self.default_calibration)
+
+    def job_budget(self):
+        return max(0, self.budget - sum(self.resident_models.values()))
+
+    def plan(self, duration, model_name, **kwargs):
+        profile = model_profile(model_name)
+        if profile.get('whole_track'):
+            candidates = [duration]
+        else:
+            max_segment = profile['max_segment']
+            candidates = [max_segment] + [s for s in SEGMENT_CANDIDATES if s < max_segment]
+        budget = self.job_budget()
+        calibration = self.calibration(model_name)
+        plan = None
+        for segment in candidates:
+            raw, parts = estimate_job_memory(duration, model_name, segment, **kwargs)
+            predicted = int(raw * calibration)
+            plan = MemoryPlan(segment, predicted, parts, predicted <= budget, model_name)
+            if plan.fits:
+                break
+        return plan
+
+    def plan_batch(self, durations, model_name, window, batch_size, sample_rate=44100):
+        # Every clip's buffers are held for the whole batch, but only one batch of windows is in the model at a time.
+        # Smaller batches are tried before giving up on batching altogether
+        profile = model_profile(model_name)
+        clips = {}
+        for duration in durations:
+            _, track = estimate_job_memory(duration, model_name, window, sample_rate=sample_rate)
+            for name, size in track.items():
+                if name != 'activations':
+                    clips[name] = clips.get(name, 0) + size
+        budget = self.job_budget()
+        calibration = self.calibration(model_name)
+        plan = None
+        size = max(1, min(batch_size, len(durations)))
+        while True:
+            parts = dict(clips)
+            parts['activations'] = window * profile['activation_mb_per_second'] * MB * size
+            # The batch tensor and the estimates apply_model returns for it
+            parts['batch'] = size * window * sample_rate * 2 * 4 * (1 + profile['sources'])
+            predicted = int(sum(parts.values()) * calibration)
+            plan = MemoryPlan(window, predicted, parts, predicted <= budget, model_name, size)
+            if plan.fits or size <= 2:
+                return plan
+            size //= 2
+
+    def max_concurrent(self, predicted_bytes, limit=None):
+        n = max(1, self.job_budget() // max(1, predicted_bytes))
+        return int(min(n, limit) if limit else n)
+
+    def acquire(self, predicted_bytes):
+        with self.cond:
+            # A job larger than the whole budget is still admitted, but only on its own
+            while self.running > 0 and self.in_use + predicted_bytes > self.job_budget():
+                self.cond.wait()
+            self.in_use += predicted_bytes
+            self.running += 1
+            self.admissions += 1
+            return self.admissions
+
+    def release(self, predicted_bytes):
+        with self.cond:
+            self.in_use -= predicted_bytes
+            self.running -= 1
+            self.cond.notify_all()
+
+    def record(self, plan, actual_bytes, solo):
+        if not actual_bytes or not plan.predicted_bytes or not solo:
+            return
+        calibration = self.calibration(plan.model_name)
+        raw = plan.predicted_bytes / calibration
+        ratio = actual_bytes / raw
+        self.calibrations[plan.model_name] = round(min(4.0, max(0.5, 0.7 * calibration + 0.3 * ratio)), 3)
+
+    def admitted(self, plan, calibrate=True):
+        return _Admission(self, plan, calibrate)
+
+
+class _Admission:
+    def __init__(self, controller, plan, calibrate=True):
+        self.controller = controller
+        self.plan = plan
+        self.calibrate = calibrate
+        self.monitor = PeakMemoryMonitor()
+        self.solo = False
+        self.elapsed = None
+
+    def __enter__(self):
+        self._seq = self.controller.acquire(self.plan.predicted_bytes)
+        self.solo = self.controller.running == 1
+        self._start = time.time()
+        self.monitor.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        self.monitor.__exit__(*exc)
+        self.elapsed = time.time() - self._start
+        with self.controller.cond:
+            # Only a job that never overlapped another gives a clean peak for calibration
+            self.solo = self.solo and self.controller.running == 1 and self.controller.admissions == self._seq
+        self.controller.release(self.plan.predicted_bytes)
+        if exc[0] is None and self.calibrate:
+            self.controller.record(self.plan, self.monitor.peak_delta, self.solo)
+        return False
+
+    def report(self):
+        predicted = self.plan.predicted_bytes / MB
+        actual = self.monitor.peak_delta
+        if actual is None:
+            return f"Memory: predicted {predicted:.0f} MB (segment {self.plan.segment:g}s), actual peak unavailable"
+        return f"Memory: predicted {predicted:.0f} MB (segment {self.plan.segment:g}s), actual peak {actual / MB:.0f} MB"
@@ -0,0 +1,189 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import soundfile as sf
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Gains are in dB; None mutes the stem. "default" applies to stems not listed.
+DEFAULT_MIX_PRESETS = {
+    "karaoke": {"vocals": None},
+    "acapella": {"default": None, "vocals": 0.0},
+    "no_drums": {"drums": None},
+    "no_bass": {"bass": None},
+    "drums_-6dB": {"drums": -6.0},
+}
+
+STEM_FILE_ALIASES = {"no_vocals": "instrumental"}
+
+
+def find_stems(folder):
+    stems = {}
+    for f in sorted(os.listdir(folder)):
+        if f.lower().endswith(".wav") and not f.startswith('.'):
+            name = os.path.splitext(f)[0]
+            stems[STEM_FILE_ALIASES.get(name, name)] = os.path.join(folder, f)
+    return stems
+
+
+def discover_tracks(root):
+    tracks = []
+    for dirpath, dirs, files in os.walk(root):
+        dirs[:] = sorted(d for d in dirs if d != "mixes" and not d.startswith('.'))
+        name = os.path.basename(dirpath)
+        if name.startswith("separated ") and name.endswith(" stems"):
+            stems = find_stems(dirpath)
+            if stems:
+                tracks.append((dirpath, stems))
+    return tracks
+
+
+def preset_gains(preset, stem_names):
+    default = preset.get("default", 0.0)
+    gains = []
+    for stem in stem_names:
+        db = preset.get(stem, default)
+        gains.append(0.0 if db is None else 10 ** (db / 20.0))
+    return np.asarray(gains, dtype=np.float32)
+
+
+def preset_applies(preset, stem_names):
+    return all(k == "default" or k in stem_names for k in preset)
+
+
+class StreamingLimiter:
+    def __init__(self, sample_rate, channels=2, ceiling_db=-1.0, release_ms=200.0, lookahead_ms=2.0):
+        self.ceiling = 10 ** (ceiling_db / 20.0)
+        self.release = 20.0 / (release_ms / 1000.0 * sample_rate)
+        self.lookahead = max(1, int(sample_rate * lookahead_ms / 1000.0))
+        self.channels = channels
+        self.delay = np.zeros((self.lookahead, channels), dtype=np.float32)
+        self.prev_req = np.zeros(self.lookahead, dtype=np.float64)
+        self.prev_atten = np.zeros(self.lookahead - 1, dtype=np.float64)
+        self.last_atten = 0.0
+        self.to_skip = self.lookahead
+
+    def process(self, block):
+        n = len(block)
+        if n == 0:
+            return block[:0]
+        L = self.lookahead
+
+        peaks = np.max(np.abs(block), axis=1)
+        req = np.zeros(n, dtype=np.float64)
+        over = peaks > self.ceiling
+        req[over] = 20.0 * np.log10(peaks[over] / self.ceiling)
+
+        # Hold: each delayed output sample must already be attenuated for peaks up to L samples ahead
+        all_req = np.concatenate([self.prev_req, req])
+        held = sliding_window_view(all_req, L + 1).max(axis=1)
+        self.prev_req = all_req[-L:]
+
+        # Release: atten[j] = max(held[j], atten[j-1] - release), solved with a running maximum
+        k = np.arange(n, dtype=np.float64) * self.release
+        atten = np.maximum.accumulate(held + k) - k
+        atten = np.maximum(atten, self.last_atten - k - self.release)
+        self.last_atten = atten[-1]
+
+        # Attack: moving average over the lookahead turns the held step into a ramp that peaks on time
+        padded = np.concatenate([self.prev_atten, atten])
+        csum = np.concatenate([[0.0], np.cumsum(padded)])
+        smooth = (csum[L:] - csum[:-L]) / L
+        self.prev_atten = padded[-(L - 1):] if L > 1 else padded[:0]
+
+        gain = np.power(10.0, -smooth / 20.0).astype(np.float32)
+        audio = np.concatenate([self.delay, block])
+        out = audio[:n] * gain[:, None]
+        self.delay = audio[n:]
+        np.clip(out, -1.0, 1.0, out=out)
+
+        if self.to_skip:
+            skip = min(self.to_skip, len(out))
+            out = out[skip:]
+            self.to_skip -= skip
+        return out
+
+    def flush(self):
+        return self.process(np.zeros((self.lookahead, self.channels), dtype=np.float32))
+
+
+def render_mix(stems, preset, out_path, block_frames=65536, subtype="PCM_16", limiter=True):
+    names = [s for s in stems if preset_gains(preset, [s])[0] > 0]
+    if not names:
+        raise Exception("Preset mutes every stem")
+    gains = preset_gains(preset, names)
+
+    files = [sf.SoundFile(stems[s]) for s in names]
+    try:
+        sample_rate = files[0].samplerate
+        for s, f in zip(names, files):
+            if f.samplerate != sample_rate:
+                raise Exception(f"Sample rate mismatch for {s}")
+        total_frames = max(f.frames for f in files)
+
+        os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+        tmp_path = out_path + ".part"
+        stack = np.zeros((len(files), block_frames, 2), dtype=np.float32)
+        lim = StreamingLimiter(sample_rate) if limiter else None
+
+        with sf.SoundFile(tmp_path, 'w', samplerate=sample_rate, channels=2, subtype=subtype, format="WAV") as out:
+            pos = 0
+            while pos < total_frames:
+                n = min(block_frames, total_frames - pos)
+                for i, f in enumerate(files):
+                    data = f.read(n, dtype='float32', always_2d=True)
+                    got = len(data)
+                    if data.shape[1] == 1:
+                        stack[i, :got] = data
+                    else:
+                        stack[i, :got] = data[:, :2]
+                    if got < n:
+                        stack[i, got:n] = 0.0
+                mixed = np.tensordot(gains, stack[:, :n], axes=1)
+                if lim is not None:
+                    mixed = lim.process(mixed)
+                else:
+                    np.clip(mixed, -1.0, 1.0, out=mixed)
+                out.write(mixed)
+                pos += n
+            if lim is not None:
+                out.write(lim.flush())
+        os.replace(tmp_path, out_path)
+    finally:
+        for f in files:
+            f.close()
+    return out_path
+
+
+def render_track(track_dir, stems, presets, overwrite=False, **kwargs):
+    results = []
+    mix_dir = os.path.join(track_dir, "mixes")
+    for name, preset in presets.items():
+        out_path = os.path.join(mix_dir, f"{name}.wav")
+        if not preset_applies(preset, stems):
+            results.append((out_path, "skipped", "stem not in this track"))
+            continue
+        if not overwrite and os.path.exists(out_path):
+            results.append((out_path, "exists", None))
+            continue
+        try:
+            render_mix(stems, preset, out_path, **kwargs)
+            results.append((out_path, "done", None))
+        except Exception as e:
+            results.append((out_path, "failed", str(e)))
+    return results
+
+
+def render_batch(tracks, presets=None, workers=None, overwrite=False, progress=None, **kwargs):
+    presets = presets or DEFAULT_MIX_PRESETS
+    workers = workers or min(8, (os.cpu_count() or 2))
+    start = time.time()
+    results = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(render_track, d, s, presets, overwrite, **kwargs) for d, s in tracks]
+        for idx, fut in enumerate(futures, 1):
+            results.extend(fut.result())
+            if progress:
+                progress(idx, len(futures))
+    return results, time.time() - start
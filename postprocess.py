@@ -0,0 +1,109 @@
+import os
+import json
+import shutil
+import hashlib
+
+from pydub import AudioSegment
+from pydub.effects import normalize, high_pass_filter, low_pass_filter, compress_dynamic_range
+
+RAW_DIRNAME = ".raw"
+PROCESSED_DIRNAME = ".processed"
+
+# The chain the app has always applied: 80 Hz high-pass, pydub's default compressor, peak normalize
+DEFAULT_CHAIN = [
+    {"type": "high_pass", "cutoff": 80},
+    {"type": "compress", "threshold": -20.0, "ratio": 4.0, "attack": 5.0, "release": 50.0},
+    {"type": "normalize", "headroom": 0.1},
+]
+
+STEPS = {
+    "high_pass": lambda audio, cutoff=80: high_pass_filter(audio, cutoff=cutoff),
+    "low_pass": lambda audio, cutoff=16000: low_pass_filter(audio, cutoff=cutoff),
+    "compress": lambda audio, **params: compress_dynamic_range(audio, **params),
+    "normalize": lambda audio, headroom=0.1: normalize(audio, headroom=headroom),
+    "gain": lambda audio, db=0.0: audio.apply_gain(db),
+}
+
+
+def chain_from_config(config):
+    if not config.get("post_process", True):
+        return []
+    return config.get("post_process_chain", DEFAULT_CHAIN)
+
+
+def chain_for(chain, stem):
+    # A dict chain may override the default chain ("default" key) for individual stems
+    if isinstance(chain, dict):
+        return chain.get(stem, chain.get("default", []))
+    return chain
+
+
+def validate_chain(chain):
+    for steps in (chain.values() if isinstance(chain, dict) else [chain]):
+        for step in steps:
+            if step.get("type") not in STEPS:
+                raise Exception(f"Unknown post-processing step: {step.get('type')}")
+
+
+def chain_key(steps, raw_file):
+    st = os.stat(raw_file)
+    payload = json.dumps({"steps": steps, "size": st.st_size, "mtime": st.st_mtime_ns}, sort_keys=True)
+    return hashlib.sha1(payload.encode()).hexdigest()[:16]
+
+
+def raw_path(stem_dir, filename):
+    return os.path.join(stem_dir, RAW_DIRNAME, filename)
+
+
+def clear_processed(stem_dir):
+    shutil.rmtree(os.path.join(stem_dir, PROCESSED_DIRNAME), ignore_errors=True)
+
+
+def _link_or_copy(src, dst):
+    tmp = dst + ".tmp"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    try:
+        os.link(src, tmp)
+    except OSError:
+        shutil.copyfile(src, tmp)
+    os.replace(tmp, dst)
+
+
+def adopt_raw(stem_dir):
+    # Folders separated before raw stems were kept: their visible files become the raw copies
+    raw_dir = os.path.join(stem_dir, RAW_DIRNAME)
+    if os.path.isdir(raw_dir):
+        return
+    os.makedirs(raw_dir)
+    for f in os.listdir(stem_dir):
+        if f.lower().endswith(".wav") and not f.startswith('.'):
+            shutil.copyfile(os.path.join(stem_dir, f), os.path.join(raw_dir, f))
+
+
+def apply_chain(stem_dir, chain):
+    validate_chain(chain)
+    adopt_raw(stem_dir)
+    raw_dir = os.path.join(stem_dir, RAW_DIRNAME)
+    processed_dir = os.path.join(stem_dir, PROCESSED_DIRNAME)
+    ran = 0
+    for f in sorted(os.listdir(raw_dir)):
+        if not f.lower().endswith(".wav"):
+            continue
+        raw_file = os.path.join(raw_dir, f)
+        steps = chain_for(chain, os.path.splitext(f)[0])
+        if not steps:
+            _link_or_copy(raw_file, os.path.join(stem_dir, f))
+            continue
+        cached = os.path.join(processed_dir, f"{os.path.splitext(f)[0]}-{chain_key(steps, raw_file)}.wav")
+        if not os.path.exists(cached):
+            os.makedirs(processed_dir, exist_ok=True)
+            audio = AudioSegment.from_wav(raw_file)
+            for step in steps:
+                params = {k: v for k, v in step.items() if k != "type"}
+                audio = STEPS[step["type"]](audio, **params)
+            audio.export(cached + ".tmp", format="wav")
+            os.replace(cached + ".tmp", cached)
+            ran += 1
+        _link_or_copy(cached, os.path.join(stem_dir, f))
+    return ran
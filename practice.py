@@ -0,0 +1,176 @@
+import os
+import json
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+N_FFT = 2048
+HOP = 512
+WINDOW = np.hanning(N_FFT + 1)[:-1].astype(np.float32)
+WINDOW_SQ = WINDOW * WINDOW
+CACHE_DIRNAME = ".stft_cache"
+
+
+def stft_to_file(y, path, chunk_frames=2048):
+    pad = N_FFT // 2
+    y = np.pad(np.asarray(y, dtype=np.float32), (pad, pad))
+    n_frames = 1 + max(0, len(y) - N_FFT) // HOP
+    out = np.lib.format.open_memmap(path, mode='w+', dtype=np.complex64, shape=(n_frames, N_FFT // 2 + 1))
+    frames = sliding_window_view(y, N_FFT)[::HOP]
+    for first in range(0, n_frames, chunk_frames):
+        block = frames[first:first + chunk_frames] * WINDOW
+        out[first:first + len(block)] = np.fft.rfft(block, axis=1)
+    out.flush()
+    del out
+
+
+class StemSTFTCache:
+    def __init__(self, stems, stem_audio):
+        self.stems = dict(stems)
+        self.stem_audio = stem_audio
+        self.spectra = {}
+        self.meta = {}
+        self.sample_rate = None
+        self.n_frames = 0
+        self.peak = 1.0
+
+    def _meta_for(self, path):
+        st = os.stat(path)
+        return {"size": st.st_size, "mtime": st.st_mtime_ns, "n_fft": N_FFT, "hop": HOP}
+
+    def build(self):
+        mix = None
+        for stem, path in self.stems.items():
+            y, sr = self.stem_audio[stem]
+            self.sample_rate = sr
+            cache_dir = os.path.join(os.path.dirname(path), CACHE_DIRNAME)
+            os.makedirs(cache_dir, exist_ok=True)
+            npy_path = os.path.join(cache_dir, f"{stem}.npy")
+            meta_path = os.path.join(cache_dir, f"{stem}.json")
+            meta = self._meta_for(path)
+            cached = None
+            if os.path.exists(npy_path) and os.path.exists(meta_path):
+                try:
+                    with open(meta_path, 'r', encoding='utf-8') as f:
+                        cached = json.load(f)
+                except:
+                    cached = None
+            if cached != meta:
+                tmp_path = npy_path + ".tmp.npy"
+                stft_to_file(y, tmp_path)
+                os.replace(tmp_path, npy_path)
+                with open(meta_path, 'w', encoding='utf-8') as f:
+                    json.dump(meta, f)
+            self.spectra[stem] = np.load(npy_path, mmap_mode='r')
+            self.meta[stem] = meta
+            mix = y.copy() if mix is None else mix[:len(y)] + y[:len(mix)]
+        self.n_frames = min(s.shape[0] for s in self.spectra.values())
+        self.peak = float(np.max(np.abs(mix))) if mix is not None and mix.size else 1.0
+        return self
+
+    def is_current(self, stems, stem_audio):
+        # Re-processing or re-separating rewrites the stems under the same paths
+        if stems != self.stems or stem_audio is not self.stem_audio:
+            return False
+        try:
+            return all(self._meta_for(path) == self.meta.get(stem) for stem, path in self.stems.items())
+        except OSError:
+            return False
+
+
+class PracticeRenderer:
+    def __init__(self, cache, output_rate=None):
+        self.cache = cache
+        self.output_rate = output_rate or cache.sample_rate
+        self.omega = (2 * np.pi * HOP * np.arange(N_FFT // 2 + 1) / N_FFT).astype(np.float32)
+        self.seek(0.0)
+
+    def seek(self, seconds):
+        self.position = max(0.0, seconds * self.cache.sample_rate / HOP)
+        self.phase = None
+        self.tail = np.zeros(N_FFT - HOP, dtype=np.float32)
+        self.norm_tail = np.zeros(N_FFT - HOP, dtype=np.float32)
+        self.skip = 0
+        self.resample_pos = 0.0
+        self.prev_sample = np.float32(0.0)
+
+    @property
+    def seconds(self):
+        return self.position * HOP / self.cache.sample_rate
+
+    def render(self, gains, tempo=1.0, semitones=0.0, frames=86):
+        cache = self.cache
+        pitch = 2.0 ** (semitones / 12.0)
+        rate = tempo / pitch
+        last = cache.n_frames - 1
+        if self.position >= last:
+            return None
+        if self.phase is None:
+            # Frame i is centred on sample i * HOP (the cache is padded by N_FFT // 2), so after a seek the synthesis
+            # starts a few whole frames early (the first frame's phase is used as is) and the lead-in is dropped
+            target = self.position
+            self.position = float(np.floor(max(0.0, target - (N_FFT // HOP - 1) * rate)))
+            self.skip = N_FFT // 2 + int(round((target - self.position) * HOP / rate))
+
+        steps = self.position + rate * np.arange(frames)
+        steps = steps[steps < last]
+        lo = int(steps[0])
+        hi = int(steps[-1]) + 2
+
+        # Stems are mixed in the STFT domain (it is linear), so only one phase vocoder runs per block
+        names = [s for s, g in gains.items() if g > 0 and s in cache.spectra]
+        if names:
+            g = np.asarray([gains[s] for s in names], dtype=np.float32)
+            spec = np.tensordot(g, np.stack([cache.spectra[s][lo:hi] for s in names]), axes=1)
+        else:
+            spec = np.zeros((hi - lo, N_FFT // 2 + 1), dtype=np.complex64)
+
+        idx = (steps - lo).astype(np.int64)
+        frac = (steps - lo - idx).astype(np.float32)[:, None]
+        left = spec[idx]
+        right = spec[idx + 1]
+        mag = (1.0 - frac) * np.abs(left) + frac * np.abs(right)
+
+        dphi = np.angle(right) - np.angle(left) - self.omega
+        dphi -= 2 * np.pi * np.round(dphi / (2 * np.pi))
+        dphi += self.omega
+        phase0 = np.angle(left[0]) if self.phase is None else self.phase
+        phases = phase0 + np.concatenate([np.zeros((1, dphi.shape[1]), dtype=dphi.dtype), np.cumsum(dphi[:-1], axis=0)])
+        self.phase = phases[-1] + dphi[-1]
+
+        # Inverse STFT with overlap-add; the tail carries into the next block so there are no seams
+        frames_td = np.fft.irfft(mag * np.exp(1j * phases), n=N_FFT, axis=1).astype(np.float32) * WINDOW
+        k = len(frames_td)
+        buf = np.zeros((k - 1) * HOP + N_FFT, dtype=np.float32)
+        norm = np.zeros_like(buf)
+        for j in range(N_FFT // HOP):
+            part = frames_td[:, j * HOP:(j + 1) * HOP].reshape(-1)
+            buf[j * HOP:j * HOP + len(part)] += part
+            norm[j * HOP:j * HOP + len(part)] += np.tile(WINDOW_SQ[j * HOP:(j + 1) * HOP], k)
+        buf[:len(self.tail)] += self.tail
+        norm[:len(self.norm_tail)] += self.norm_tail
+        # Undo analysis+synthesis windowing: 1.5 at 75% overlap, less right after a seek where fewer frames overlap
+        block = buf[:k * HOP] / np.maximum(norm[:k * HOP], 1e-3)
+        self.tail = buf[k * HOP:].copy()
+        self.norm_tail = norm[k * HOP:].copy()
+        self.position += rate * k
+        if self.skip:
+            dropped = min(self.skip, len(block))
+            block = block[dropped:]
+            self.skip -= dropped
+            if not len(block):
+                return np.zeros(0, dtype=np.float32)
+
+        # Resample by the pitch factor (and to the output device rate) with a carried fractional position
+        step = pitch * cache.sample_rate / self.output_rate
+        n_out = int(np.floor((len(block) - 1 - self.resample_pos) / step)) + 1
+        if n_out <= 0:
+            self.resample_pos -= len(block)
+            self.prev_sample = block[-1]
+            return np.zeros(0, dtype=np.float32)
+        t = self.resample_pos + step * np.arange(n_out)
+        src = np.concatenate([[self.prev_sample], block])
+        out = np.interp(t, np.arange(-1, len(block)), src).astype(np.float32)
+        self.resample_pos = t[-1] + step - len(block)
+        self.prev_sample = block[-1]
+        return out
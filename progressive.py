@@ -0,0 +1,44 @@
+from collections import namedtuple
+
+# in_start/in_end: samples fed to the model (with context); write_start/write_end: samples kept.
+# final_until: everything before this sample is finished once the chunk has been written.
+Chunk = namedtuple("Chunk", ["in_start", "in_end", "write_start", "write_end", "fade_in", "fade_out", "final_until"])
+
+
+def plan_chunks(regions, total, sample_rate, region_pad=0.0, progressive=False,
+                first_seconds=8.0, chunk_seconds=30.0, context_seconds=2.0, crossfade_seconds=0.1):
+    pad = int(region_pad * sample_rate)
+    spans = []
+    for start, end in regions:
+        if not progressive:
+            spans.append((start, end, start, end, start > 0, end < total))
+            continue
+        # Small first chunk so playback can start quickly, then larger ones to keep the context overhead low
+        size = int((first_seconds if not spans else chunk_seconds) * sample_rate)
+        a = start
+        while a < end:
+            b = min(end, a + size)
+            if end - b < size // 4:
+                b = end
+            spans.append((a, b, start, end, a == start and start > 0, b == end and end < total))
+            a = b
+            size = int(chunk_seconds * sample_rate)
+
+    context = int(context_seconds * sample_rate) if progressive else 0
+    crossfade = int(crossfade_seconds * sample_rate)
+    chunks = []
+    for i, (a, b, region_start, region_end, at_region_start, at_region_end) in enumerate(spans):
+        inner_start = a > region_start
+        inner_end = b < region_end
+        write_end = min(region_end, b + crossfade) if inner_end else b
+        next_start = spans[i + 1][0] if i + 1 < len(spans) else total
+        chunks.append(Chunk(
+            in_start=max(region_start, a - context),
+            in_end=min(region_end, write_end + context),
+            write_start=a,
+            write_end=write_end,
+            fade_in=pad if at_region_start else (crossfade if inner_start else 0),
+            fade_out=pad if at_region_end else 0,
+            final_until=next_start
+        ))
+    return chunks
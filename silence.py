@@ -0,0 +1,79 @@
+import numpy as np
+
+
+def frame_rms_db(y, hop):
+    y = np.atleast_2d(y)
+    n = y.shape[-1]
+    full = n // hop
+    body = y[:, :full * hop].reshape(y.shape[0], full, hop)
+    power = np.einsum('cfh,cfh->cf', body, body) / hop
+    if n > full * hop:
+        tail = y[:, full * hop:]
+        power = np.concatenate([power, np.mean(tail * tail, axis=1, keepdims=True)], axis=1)
+    power = power.max(axis=0)
+    return 10 * np.log10(np.maximum(power, 1e-12))
+
+
+def find_active_regions(y, sample_rate, threshold_db=-60.0, min_silence=2.0, pad=0.5, hop=1024):
+    n = np.atleast_2d(y).shape[-1]
+    if n == 0:
+        return []
+    silent = frame_rms_db(y, hop) < threshold_db
+    edges = np.diff(np.concatenate([[0], silent.astype(np.int8), [0]]))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+
+    min_frames = int(np.ceil(min_silence * sample_rate / hop))
+    pad_samples = int(pad * sample_rate)
+
+    regions = []
+    cursor = 0
+    for s, e in zip(starts, ends):
+        if e - s < min_frames:
+            continue
+        gap_start = int(s) * hop
+        gap_end = min(int(e) * hop, n)
+        # Keep some silence on each side of the music so the model has context and the fades have room
+        if gap_start > 0:
+            gap_start += pad_samples
+        if gap_end < n:
+            gap_end -= pad_samples
+        if gap_end <= gap_start:
+            continue
+        if gap_start > cursor:
+            regions.append((cursor, gap_start))
+        cursor = gap_end
+    if cursor < n:
+        regions.append((cursor, n))
+    return regions
+
+
+def skipped_fraction(regions, n):
+    if n == 0:
+        return 0.0
+    return 1.0 - sum(e - s for s, e in regions) / n
+
+
+def silence_background(y, n_sources, mode="zeros", gain=0.5):
+    y = np.atleast_2d(y)
+    out = np.zeros((n_sources,) + y.shape, dtype=np.float32)
+    if mode == "passthrough":
+        # Split the attenuated mix evenly so the stems still sum to (a quieter) original
+        out[:] = y[None] * (gain / n_sources)
+    return out
+
+
+def blend_region(out, chunk, start, fade_in=0, fade_out=0):
+    length = chunk.shape[-1]
+    end = start + length
+    fade_in = min(fade_in, length // 2)
+    fade_out = min(fade_out, length // 2)
+    if fade_in <= 0 and fade_out <= 0:
+        out[..., start:end] = chunk
+        return
+    w = np.ones(length, dtype=np.float32)
+    if fade_in > 0:
+        w[:fade_in] = np.linspace(0.0, 1.0, fade_in, dtype=np.float32)
+    if fade_out > 0:
+        w[-fade_out:] = np.linspace(1.0, 0.0, fade_out, dtype=np.float32)
+    out[..., start:end] = chunk * w + out[..., start:end] * (1.0 - w)
@@ -0,0 +1,31 @@
+import numpy as np
+import soundfile as sf
+
+from practice import StemSTFTCache, PracticeRenderer
+
+
+def render_all(renderer):
+    blocks = []
+    while True:
+        block = renderer.render({'mix': 1.0})
+        if block is None:
+            return np.concatenate(blocks)
+        blocks.append(block)
+
+
+def test_identity_render_matches_source_at_lag_zero(tmp_path):
+    sr = 44100
+    t = np.arange(sr * 3) / sr
+    y = (0.3 * np.sin(2 * np.pi * 220 * t) + 0.1 * np.random.default_rng(0).standard_normal(len(t))).astype(np.float32)
+    path = tmp_path / "mix.wav"
+    sf.write(path, y, sr)
+    cache = StemSTFTCache({'mix': str(path)}, {'mix': (y, sr)}).build()
+
+    # Whole and fractional frame positions, including one too close to the start for a full lead-in
+    for seconds in (0.0, 0.0117, 1.0, 0.9984):
+        renderer = PracticeRenderer(cache)
+        renderer.seek(seconds)
+        out = render_all(renderer)
+        start = int(round(seconds * sr))
+        n = min(len(out), len(y) - start) - 2048
+        assert np.max(np.abs(out[:n] - y[start:start + n])) < 0.02
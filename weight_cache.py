@@ -0,0 +1,200 @@
+import os
+import json
+import time
+import hashlib
+import importlib
+from fractions import Fraction
+from pathlib import Path
+
+import torch
+import demucs
+from demucs import pretrained
+from demucs.apply import BagOfModels
+
+try:
+    from safetensors.torch import save_file, load_file
+except ImportError:
+    save_file = load_file = None
+
+MANIFEST = "manifest.json"
+CACHE_VERSION = 1
+
+
+def _encode(value):
+    if isinstance(value, Fraction):
+        return {"__fraction__": [value.numerator, value.denominator]}
+    if isinstance(value, tuple):
+        return {"__tuple__": [_encode(v) for v in value]}
+    if isinstance(value, list):
+        return [_encode(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _encode(v) for k, v in value.items()}
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    raise TypeError(f"Cannot cache model argument of type {type(value).__name__}")
+
+
+def _decode(value):
+    if isinstance(value, list):
+        return [_decode(v) for v in value]
+    if isinstance(value, dict):
+        if "__fraction__" in value:
+            return Fraction(*value["__fraction__"])
+        if "__tuple__" in value:
+            return tuple(_decode(v) for v in value["__tuple__"])
+        return {k: _decode(v) for k, v in value.items()}
+    return value
+
+
+def checkpoint_files(name):
+    # Where demucs' legacy repo keeps the pretrained checkpoints for a bag (or single signature)
+    yaml_file = pretrained.REMOTE_ROOT / f"{name}.yaml"
+    sigs = [name]
+    if yaml_file.exists():
+        import yaml
+        with open(yaml_file) as f:
+            sigs = yaml.safe_load(f)['models']
+    urls = pretrained._parse_remote_files(pretrained.REMOTE_ROOT / 'files.txt')
+    hub = Path(torch.hub.get_dir()) / 'checkpoints'
+    return yaml_file if yaml_file.exists() else None, [hub / os.path.basename(urls[s]) for s in sigs if s in urls]
+
+
+def fingerprint(name):
+    h = hashlib.sha1(f"{CACHE_VERSION}|{name}|{getattr(demucs, '__version__', '')}".encode())
+    try:
+        yaml_file, files = checkpoint_files(name)
+    except Exception:
+        yaml_file, files = None, []
+    if yaml_file is not None:
+        h.update(yaml_file.read_bytes())
+    for path in files:
+        if path.exists():
+            st = path.stat()
+            h.update(f"{path.name}|{st.st_size}|{st.st_mtime_ns}".encode())
+    return h.hexdigest()
+
+
+def _klass_name(model):
+    return f"{type(model).__module__}.{type(model).__qualname__}"
+
+
+def _load_klass(name):
+    module, _, qualname = name.rpartition('.')
+    return getattr(importlib.import_module(module), qualname)
+
+
+class WeightCache:
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+
+    def model_dir(self, name):
+        return os.path.join(self.cache_dir, name)
+
+    def get_model(self, name):
+        expected = fingerprint(name)
+        try:
+            model = self.load(name, expected)
+            if model is not None:
+                return model
+        except Exception:
+            pass
+        model = pretrained.get_model(name)
+        try:
+            # Downloading the checkpoint on first use changes what the fingerprint sees
+            self.save(name, model, fingerprint(name))
+        except Exception:
+            pass
+        return model
+
+    def save(self, name, model, fp):
+        bag = isinstance(model, BagOfModels)
+        members = list(model.models) if bag else [model]
+        entries = []
+        state = {}
+        for i, member in enumerate(members):
+            args, kwargs = member._init_args_kwargs
+            entries.append({
+                "klass": _klass_name(member),
+                "args": _encode(list(args)),
+                "kwargs": _encode(kwargs),
+                # A bag may have overridden the member's segment after construction
+                "segment": _encode(getattr(member, 'segment', None)),
+            })
+            for k, v in member.state_dict().items():
+                state[f"{i}.{k}"] = v.detach().cpu().contiguous()
+        manifest = {"fingerprint": fp, "version": CACHE_VERSION, "bag": bag, "models": entries}
+        if bag:
+            manifest["weights"] = model.weights
+
+        out_dir = self.model_dir(name)
+        os.makedirs(out_dir, exist_ok=True)
+        if save_file is not None:
+            manifest["format"] = "safetensors"
+            weights_file = os.path.join(out_dir, "weights.safetensors")
+            save_file(state, weights_file + ".tmp")
+        else:
+            manifest["format"] = "torch"
+            weights_file = os.path.join(out_dir, "weights.pt")
+            torch.save(state, weights_file + ".tmp")
+        os.replace(weights_file + ".tmp", weights_file)
+        manifest_file = os.path.join(out_dir, MANIFEST)
+        with open(manifest_file + ".tmp", 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(manifest_file + ".tmp", manifest_file)
+
+    def load(self, name, expected):
+        manifest_file = os.path.join(self.model_dir(name), MANIFEST)
+        if not os.path.exists(manifest_file):
+            return None
+        with open(manifest_file, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get("fingerprint") != expected or manifest.get("version") != CACHE_VERSION:
+            return None
+
+        if manifest["format"] == "safetensors":
+            if load_file is None:
+                return None
+            state = load_file(os.path.join(self.model_dir(name), "weights.safetensors"))
+        else:
+            path = os.path.join(self.model_dir(name), "weights.pt")
+            try:
+                state = torch.load(path, map_location='cpu', mmap=True, weights_only=True)
+            except TypeError:
+                state = torch.load(path, map_location='cpu')
+
+        members = []
+        for i, entry in enumerate(manifest["models"]):
+            prefix = f"{i}."
+            member_state = {k[len(prefix):]: v for k, v in state.items() if k.startswith(prefix)}
+            members.append(self._build(entry, member_state))
+
+        if manifest["bag"]:
+            model = BagOfModels(members, manifest.get("weights"))
+        else:
+            model = members[0]
+        model.eval()
+        return model
+
+    def _build(self, entry, state):
+        klass = _load_klass(entry["klass"])
+        model = klass(*_decode(entry["args"]), **_decode(entry["kwargs"]))
+        # assign=True keeps the mapped tensors instead of copying them into freshly initialised ones
+        try:
+            model.load_state_dict(state, assign=True)
+        except TypeError:
+            model.load_state_dict(state)
+        if entry.get("segment") is not None:
+            model.segment = _decode(entry["segment"])
+        return model
+
+
+def load_model(name, cache_dir=None, enabled=True):
+    if not enabled or not cache_dir:
+        return pretrained.get_model(name)
+    return WeightCache(cache_dir).get_model(name)
+
+
+def timed_load(name, cache_dir=None, enabled=True):
+    start = time.time()
+    model = load_model(name, cache_dir, enabled)
+    return model, time.time() - start